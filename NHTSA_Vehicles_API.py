@@ -1,8 +1,124 @@
+import hashlib
 import json
-import requests
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from vehicle_catalog import load_cached
 
-def fetch_vehicle_data():
-    """Fetch vehicle data from NHTSA API and save to JSON file"""
+# Point this at a local stub server to fetch without touching the real API
+NHTSA_BASE_URL = os.getenv("NHTSA_BASE_URL", "https://vpic.nhtsa.dot.gov/api/vehicles")
+NHTSA_CACHE_DIR = ".nhtsa_cache"
+
+def _make_session(pool_size=8, retries=3):
+    """Create a pooled HTTP session that retries transient failures"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _cached_get_json(session, url, cache_dir=NHTSA_CACHE_DIR, ttl=7 * 24 * 3600, timeout=30):
+    """GET a JSON document, caching the response on disk
+    
+    A cached response younger than ttl is returned without any network call.
+    An older one is revalidated with its ETag/Last-Modified, and a 304 reply
+    reuses the cached body.
+    
+    Args:
+        session (requests.Session): Session to send requests with
+        url (str): URL to fetch
+        cache_dir (str): Directory for cached responses. None disables caching
+        ttl (float): Seconds a cached response is used without revalidation
+        timeout (float): Request timeout in seconds
+        
+    Returns:
+        dict: Parsed JSON response
+    """
+    if cache_dir is None:
+        response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_file = os.path.join(cache_dir, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+    cached = None
+    if os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+        if time.time() - cached["fetched_at"] < ttl:
+            return cached["body"]
+    
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    
+    response = session.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        body = cached["body"]
+    else:
+        response.raise_for_status()
+        body = response.json()
+        cached = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+    cached["body"] = body
+    cached["fetched_at"] = time.time()
+    
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(cached, f)
+    os.replace(tmp_file, cache_file)
+    return body
+
+def _write_if_changed(data, file_path):
+    """Write JSON to file_path, leaving the file untouched if its content is the same"""
+    content = json.dumps(data, indent=2)
+    try:
+        with open(file_path, "r") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_file = file_path + ".tmp"
+    with open(tmp_file, "w") as f:
+        f.write(content)
+    os.replace(tmp_file, file_path)
+    return True
+
+def fetch_vehicle_data(file_path="vehicle_data.json", base_url=None, max_workers=8,
+                       cache_dir=NHTSA_CACHE_DIR, ttl=7 * 24 * 3600, timeout=30):
+    """Fetch vehicle data from NHTSA API and save to JSON file
+    
+    Model lists are fetched in parallel over one pooled session, and every
+    response is cached on disk, so a warm run makes no network calls.
+    
+    Args:
+        file_path (str): Path to the vehicle data JSON file
+        base_url (str): NHTSA vPIC API base URL. Defaults to NHTSA_BASE_URL
+        max_workers (int): Maximum number of concurrent requests
+        cache_dir (str): Directory for cached responses. None disables caching
+        ttl (float): Seconds a cached response is used without revalidation
+        timeout (float): Request timeout in seconds
+        
+    Returns:
+        dict: Models for each make, {make: [models]}
+    """
+    base_url = (base_url or NHTSA_BASE_URL).rstrip("/")
     # Specific car brands we want to include
     car_brands = [
         "Acura", "Alfa Romeo", "Audi", "BMW", "Bentley", "Buick", "Cadillac", 
@@ -15,12 +131,13 @@ def fetch_vehicle_data():
         "Volkswagen", "Volvo"
     ]
     
+    session = _make_session(pool_size=max_workers)
+    
     # Get all makes
-    makes_url = "https://vpic.nhtsa.dot.gov/api/vehicles/getallmakes?format=json"
+    makes_url = f"{base_url}/getallmakes?format=json"
     
     try:
-        makes_response = requests.get(makes_url)
-        makes_json = makes_response.json()
+        makes_json = _cached_get_json(session, makes_url, cache_dir, ttl, timeout)
         
         if "Results" not in makes_json:
             print("API response format is unexpected")
@@ -37,40 +154,41 @@ def fetch_vehicle_data():
             
     except Exception as e:
         print(f"Error fetching makes: {e}")
+        session.close()
         return {"toyota": ["camry", "corolla"], "honda": ["civic", "accord"]}
     
-    vehicle_data = {}
-    
-    # For each make, get its models
-    for make in makes_data:
+    def fetch_models(make):
         make_name = make["Make_Name"].lower()
-        vehicle_data[make_name] = []
-        
+        models = []
         try:
             # Get models for this make - using Make_ID for more reliable results
             make_id = make["Make_ID"]
-            models_url = f"https://vpic.nhtsa.dot.gov/api/vehicles/GetModelsForMakeId/{make_id}?format=json"
-            models_response = requests.get(models_url)
+            models_url = f"{base_url}/GetModelsForMakeId/{make_id}?format=json"
+            models_json = _cached_get_json(session, models_url, cache_dir, ttl, timeout)
             
             # Check if we got the expected structure and handle errors
-            models_json = models_response.json()
             if "Results" in models_json and models_json["Results"]:
-                models_data = models_json["Results"]
-                
-                for model in models_data:
+                for model in models_json["Results"]:
                     if "Model_Name" in model:
-                        model_name = model["Model_Name"].lower()
-                        vehicle_data[make_name].append(model_name)
+                        models.append(model["Model_Name"].lower())
             else:
                 print(f"Could not get models for {make_name} (ID: {make_id})")
-                vehicle_data[make_name].append("unknown_model")
+                models.append("unknown_model")
         except Exception as e:
             print(f"Error fetching models for {make_name}: {e}")
-            vehicle_data[make_name].append("error_model")
+            models.append("error_model")
+        return make_name, models
     
-    # Save to JSON file
-    with open("vehicle_data.json", "w") as f:
-        json.dump(vehicle_data, f, indent=2)
+    # For each make, get its models
+    vehicle_data = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for make_name, models in executor.map(fetch_models, makes_data):
+            vehicle_data.setdefault(make_name, []).extend(models)
+    session.close()
+    
+    # Save to JSON file, only rewriting it when the catalog changed
+    if _write_if_changed(vehicle_data, file_path):
+        print(f"Updated {file_path}")
     
     return vehicle_data
 
@@ -85,17 +203,33 @@ def load_vehicle_data(file_path="vehicle_data.json", years=None, makes=None):
     Returns:
         list: List of dictionaries with make, model, and year ready for scraping
     """
+    return list(iter_vehicle_data(file_path, years, makes))
+
+def iter_vehicle_data(file_path="vehicle_data.json", years=None, makes=None):
+    """Generate the vehicles from load_vehicle_data one at a time
+    
+    Pair with vehicle_catalog.plan_vehicles to keep only the vehicles
+    Consumer Reports has pages for, without building the full list.
+    
+    Args:
+        file_path (str): Path to the vehicle data JSON file
+        years (list): List of years to include. Defaults to 2010-2025 if None
+        makes (list): List of makes to include. Defaults to all makes if None
+        
+    Yields:
+        dict: Vehicle with make, model, and year ready for scraping
+    """
     # Set default years if none provided
     if years is None:
         years = list(range(2010, 2026))  # Years from 2010 to 2025
     
     # Load raw data
     try:
-        with open(file_path, "r") as f:
-            raw_data = json.load(f)
+        # Parsed once per process and reused until the file changes
+        raw_data = load_cached(file_path)
     except FileNotFoundError:
         print(f"File {file_path} not found. Fetching data...")
-        raw_data = fetch_vehicle_data()
+        raw_data = fetch_vehicle_data(file_path)
     
     # Filter makes if specified
     if makes is not None:
@@ -104,9 +238,6 @@ def load_vehicle_data(file_path="vehicle_data.json", years=None, makes=None):
         raw_data = {make: models for make, models in raw_data.items() 
                    if make.lower() in makes_lower}
     
-    # Process the data
-    vehicles_to_scrape = []
-    
     for make, models in raw_data.items():
         # Convert make to lowercase
         make_lower = make.lower()
@@ -117,13 +248,11 @@ def load_vehicle_data(file_path="vehicle_data.json", years=None, makes=None):
             
             # Add an entry for each year
             for year in years:
-                vehicles_to_scrape.append({
+                yield {
                     'make': make_lower,
                     'model': model_formatted,
                     'year': year
-                })
-    
-    return vehicles_to_scrape
+                }
 
 if __name__ == "__main__":
     # Run this file to generate the JSON data
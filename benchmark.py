@@ -0,0 +1,355 @@
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+from consumer_reports_scraper import ConsumerReportsScraper
+from vehicle_catalog import CatalogIndex, plan_vehicles
+
+RESULTS_FILE = 'benchmark_results.jsonl'
+
+# A handful of overview pages with and without ratings
+SAMPLE_VEHICLES = [
+    {'make': 'Toyota', 'model': 'Camry', 'year': 2016},
+    {'make': 'Toyota', 'model': 'Corolla', 'year': 2016},
+    {'make': 'Toyota', 'model': 'RAV4', 'year': 2016},
+    {'make': 'Honda', 'model': 'Civic', 'year': 2018},
+    {'make': 'Mazda', 'model': 'CX-5', 'year': 2019},
+    {'make': 'Toyota', 'model': 'Mirai', 'year': 2016},
+]
+
+
+def measure_page_loads(vehicles, **scraper_options):
+    """Scrape vehicles one at a time and measure latency and bandwidth
+
+    Args:
+        vehicles (list): List of dicts with keys 'make', 'model', 'year'
+        **scraper_options: Keyword arguments for ConsumerReportsScraper
+
+    Returns:
+        dict: Per-vehicle latencies in seconds and total response bytes
+    """
+    scraper = ConsumerReportsScraper(**scraper_options)
+    if not scraper.start_session():
+        return None
+
+    received = [0]
+
+    def count_bytes(request):
+        try:
+            received[0] += request.sizes()['responseBodySize']
+        except Exception:
+            pass
+
+    latencies = []
+    try:
+        scraper.context.on('requestfinished', count_bytes)
+        for vehicle in vehicles:
+            start = time.perf_counter()
+            scraper.scrape_vehicle(vehicle['make'], vehicle['model'], vehicle['year'])
+            latencies.append(time.perf_counter() - start)
+    finally:
+        scraper.close_session()
+
+    return {'latencies': latencies, 'bytes': received[0]}
+
+
+def benchmark_resource_blocking(vehicles=SAMPLE_VEHICLES):
+    """Compare page loads with the default settings against resource blocking
+
+    Args:
+        vehicles (list): List of dicts with keys 'make', 'model', 'year'
+    """
+    configs = {
+        'networkidle, no blocking': {},
+        'networkidle, blocking': {'block_resources': True},
+        'selectors, blocking': {'block_resources': True, 'wait_for': 'selectors'},
+    }
+
+    print(f"{'configuration':<28}{'mean s':>10}{'max s':>10}{'MB':>10}")
+    for name, options in configs.items():
+        stats = measure_page_loads(vehicles, **options)
+        if stats is None:
+            print(f"{name:<28}login failed")
+            continue
+        latencies = stats['latencies']
+        print(f"{name:<28}{statistics.mean(latencies):>10.2f}{max(latencies):>10.2f}{stats['bytes'] / 1e6:>10.2f}")
+
+
+def synthetic_catalog(num_makes=50, models_per_make=40, years=range(2000, 2026)):
+    """Build a catalog of made-up vehicles in the Consumer_Reports_Vehicle_List.json layout
+
+    Args:
+        num_makes (int): Number of makes
+        models_per_make (int): Number of models per make
+        years (iterable): Model years every model is available in
+
+    Returns:
+        dict: Catalog {make: {model: [years]}}
+    """
+    years = list(years)
+    return {
+        f'Make{m:03d}': {f'Model {m:03d}-{n:03d}': years for n in range(models_per_make)}
+        for m in range(num_makes)
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its children (e.g. the browser), in MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 / 1024 ** 2 if sys.platform == 'darwin' else 1 / 1024
+    return round(sum(resource.getrusage(who).ru_maxrss
+                     for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)) * scale, 1)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_result(name, params, metrics, results_file=RESULTS_FILE):
+    """Append a benchmark run to the results file and print it next to the previous run
+
+    Runs are compared against the last one with the same name and parameters,
+    so regressions show up as a change in the numbers.
+
+    Args:
+        name (str): Benchmark name
+        params (dict): Parameters the benchmark ran with
+        metrics (dict): Measured numbers
+        results_file (str): JSON Lines file the runs are appended to
+    """
+    previous = None
+    if os.path.exists(results_file):
+        with open(results_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry['benchmark'] == name and entry['params'] == params:
+                        previous = entry
+
+    with open(results_file, 'a') as f:
+        f.write(json.dumps({'benchmark': name, 'params': params, 'metrics': metrics,
+                            'revision': git_revision(), 'timestamp': time.time()}) + '\n')
+
+    print(f"\n{name} {params}")
+    for key, value in metrics.items():
+        line = f"  {key:<24}{value!s:>12}"
+        before = previous['metrics'].get(key) if previous else None
+        if isinstance(value, (int, float)) and isinstance(before, (int, float)) and before:
+            line += f"   ({(value - before) / before:+.1%} vs {previous['revision'] or 'previous run'})"
+        print(line)
+
+
+def benchmark_planning(num_makes=50, models_per_make=40, years=range(2000, 2026), unknown_fraction=0.2):
+    """Time building the catalog index and planning the vehicles to scrape
+
+    The planner input is every catalog vehicle plus a share of vehicles
+    Consumer Reports has no page for, like the NHTSA list.
+
+    Args:
+        num_makes (int): Number of makes in the synthetic catalog
+        models_per_make (int): Number of models per make
+        years (iterable): Model years every model is available in
+        unknown_fraction (float): Extra vehicles not in the catalog, as a share of the catalog size
+
+    Returns:
+        dict: Timings in seconds and vehicle counts
+    """
+    catalog = synthetic_catalog(num_makes, models_per_make, years)
+    years = list(years)
+
+    def candidates():
+        for make, models in catalog.items():
+            for model in models:
+                for year in years:
+                    yield {'make': make.lower(), 'model': model.lower().replace(' ', '-'), 'year': year}
+        unknown = int(num_makes * models_per_make * len(years) * unknown_fraction)
+        for i in range(unknown):
+            yield {'make': 'unknown', 'model': f'model-{i}', 'year': years[i % len(years)]}
+
+    start = time.perf_counter()
+    index = CatalogIndex(catalog)
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planned = sum(1 for _ in plan_vehicles(candidates(), index))
+    plan_seconds = time.perf_counter() - start
+
+    metrics = {
+        'index_seconds': round(index_seconds, 4),
+        'plan_seconds': round(plan_seconds, 4),
+        'planned_vehicles': planned,
+        'vehicles_per_second': round(planned / plan_seconds, 1) if plan_seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    record_result('planning', {'makes': num_makes, 'models_per_make': models_per_make,
+                               'years': len(years)}, metrics)
+    return metrics
+
+
+def benchmark_nhtsa(latency=0.0, max_workers=8):
+    """Time fetching and loading the NHTSA vehicle list from the fixture server
+
+    Args:
+        latency (float): Seconds the fixture server waits before each response
+        max_workers (int): Concurrent NHTSA requests
+
+    Returns:
+        dict: Timings in seconds and vehicle counts
+    """
+    from fixture_server import FixtureServer
+    from NHTSA_Vehicles_API import fetch_vehicle_data, load_vehicle_data
+
+    with FixtureServer(latency=latency) as server, tempfile.TemporaryDirectory() as tmp:
+        file_path = os.path.join(tmp, 'vehicle_data.json')
+        start = time.perf_counter()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fetch_vehicle_data(file_path, base_url=server.nhtsa_url, max_workers=max_workers, cache_dir=None)
+        fetch_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        vehicles = load_vehicle_data(file_path)
+        load_seconds = time.perf_counter() - start
+
+    metrics = {
+        'fetch_seconds': round(fetch_seconds, 4),
+        'load_seconds': round(load_seconds, 4),
+        'vehicles': len(vehicles),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    record_result('nhtsa', {'latency': latency, 'max_workers': max_workers}, metrics)
+    return metrics
+
+
+class _TimedScraper(ConsumerReportsScraper):
+    """Scraper that records how long each vehicle takes from navigation to extracted result"""
+    def __init__(self, catalog, **options):
+        super().__init__(**options)
+        self.catalog_index = CatalogIndex(catalog)
+        self.started = {}
+        self.latencies = []
+
+    def load_catalog_index(self, filename=None):
+        return self.catalog_index
+
+    def _open_overview(self, page, make, model, year):
+        self.started[(make, model, year)] = time.perf_counter()
+        return super()._open_overview(page, make, model, year)
+
+    def _extract_vehicle(self, page, make, model, year):
+        result = super()._extract_vehicle(page, make, model, year)
+        self.latencies.append(time.perf_counter() - self.started.pop((make, model, year)))
+        return result
+
+
+def benchmark_scraping(num_vehicles=100, workers=1, latency=0.05, **scraper_options):
+    """Scrape vehicles from the fixture server and measure throughput and latency
+
+    Runs the full browser pipeline (login, navigation, waiting and
+    extraction) against pages served locally, so runs are repeatable and
+    need no credentials. Nothing is read from or written to the result cache.
+
+    Args:
+        num_vehicles (int): Vehicles to scrape
+        workers (int): Pages loading vehicles concurrently
+        latency (float): Seconds the fixture server waits before each response
+        **scraper_options: Keyword arguments for ConsumerReportsScraper
+
+    Returns:
+        dict: Throughput, per-vehicle latency percentiles and peak RSS
+    """
+    from fixture_server import FixtureServer
+
+    num_makes = max(1, num_vehicles // 100)
+    catalog = synthetic_catalog(num_makes, 10, range(2016, 2026))
+    vehicles = [{'make': make, 'model': model, 'year': year}
+                for make, models in catalog.items() for model, years in models.items() for year in years]
+    vehicles = vehicles[:num_vehicles]
+
+    options = {'headless': True, 'storage_state_file': None, 'dead_letter_file': os.devnull, **scraper_options}
+    with FixtureServer(catalog, latency=latency) as server:
+        scraper = _TimedScraper(catalog, base_url=server.url, **options)
+        try:
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                if not scraper.start_session():
+                    raise RuntimeError("Could not start a browser session against the fixture server")
+                start = time.perf_counter()
+                scraped = sum(1 for _ in scraper.iter_vehicles(vehicles, workers=workers, requests_per_second=1000))
+                elapsed = time.perf_counter() - start
+        finally:
+            scraper.close_session()
+
+    metrics = {
+        'vehicles': scraped,
+        'seconds': round(elapsed, 3),
+        'vehicles_per_second': round(scraped / elapsed, 2) if elapsed else None,
+        'p50_latency_seconds': round(percentile(scraper.latencies, 50) or 0, 4),
+        'p95_latency_seconds': round(percentile(scraper.latencies, 95) or 0, 4),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    record_result('scraping', {'vehicles': num_vehicles, 'workers': workers, 'latency': latency,
+                               **{key: value for key, value in scraper_options.items()
+                                  if isinstance(value, (str, int, float, bool))}}, metrics)
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark.py',
+                                     description="Benchmark the scraper offline, or page loads on the live site")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    planning = subparsers.add_parser('planning', help="Catalog indexing and vehicle planning")
+    planning.add_argument('--makes', type=int, default=50)
+    planning.add_argument('--models-per-make', type=int, default=40)
+    planning.add_argument('--years', type=int, default=26, help="Model years per model")
+
+    nhtsa = subparsers.add_parser('nhtsa', help="Fetching and loading the NHTSA vehicle list from the fixture server")
+    nhtsa.add_argument('--latency', type=float, default=0.0)
+    nhtsa.add_argument('--max-workers', type=int, default=8)
+
+    scrape = subparsers.add_parser('scrape', help="Scraping overview pages from the fixture server")
+    scrape.add_argument('--vehicles', type=int, default=100)
+    scrape.add_argument('--workers', type=int, default=1)
+    scrape.add_argument('--latency', type=float, default=0.05, help="Server response delay in seconds")
+    scrape.add_argument('--wait-for', default='networkidle', choices=['networkidle', 'selectors'])
+    scrape.add_argument('--block-resources', action='store_true')
+    scrape.add_argument('--extraction', default='dom', choices=['dom', 'http'])
+
+    subparsers.add_parser('live', help="Resource blocking on the live site (needs CR credentials)")
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'planning':
+        benchmark_planning(args.makes, args.models_per_make, range(2026 - args.years, 2026))
+    elif args.benchmark == 'nhtsa':
+        benchmark_nhtsa(args.latency, args.max_workers)
+    elif args.benchmark == 'scrape':
+        benchmark_scraping(args.vehicles, args.workers, args.latency, wait_for=args.wait_for,
+                           block_resources=args.block_resources, extraction=args.extraction)
+    else:
+        load_dotenv("ConsumerReportsLogins.env")
+        benchmark_resource_blocking()
+
+
+if __name__ == "__main__":
+    main()
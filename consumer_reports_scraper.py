@@ -1,52 +1,308 @@
+import json
 import os
 from dotenv import load_dotenv
-from playwright.sync_api import sync_playwright
-import pandas as pd
+import heapq
+import itertools
 import time
+from collections import deque
+from urllib.parse import urlparse
+from cr_payload import parse_overview_html
+from field_extraction import (EXTENDED_FIELD_SPEC, FIELD_SPEC, MPG_SELECTOR, NO_RATINGS_SELECTOR, SCORE_SELECTOR,
+                              extract_fields, has_values)
+from metrics import ScrapeMetrics
+from output_writers import result_key
+from records import VehicleRecord
+from scheduler import AdaptiveRateLimiter, DeadLetterQueue, EmptyPageError, RetryPolicy, ScrapeError, check_response
+from vehicle_catalog import CATALOG_FILE, CatalogIndex, has_year, normalize_name
+
+MODEL_OPTION_SELECTOR = '.cr-cf-model-options .cr-cf-chunked-options__item'
+YEAR_OPTION_SELECTOR = '.cr-cf-grouped-options__item'
+
+# Only shown in the site header to visitors who are not signed in
+SIGN_IN_SELECTOR = 'span.cda-gnav__main-sign-in'
+
+# Point this at a local fixture server to run without the live site
+CR_BASE_URL = os.getenv('CR_BASE_URL', 'https://www.consumerreports.org')
+
+# Resources that are never needed to read the scores off an overview page
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+BLOCKED_DOMAINS = (
+    'doubleclick.net', 'googlesyndication.com', 'googletagmanager.com',
+    'google-analytics.com', 'facebook.net', 'adobedtm.com', 'omtrdc.net',
+    'demdex.net', 'hotjar.com', 'optimizely.com', 'nr-data.net',
+    'scorecardresearch.com', 'taboola.com', 'outbrain.com', 'segment.io',
+)
+
 
 class ConsumerReportsScraper:
-    def __init__(self):
+    def __init__(self, cache=None, block_resources=False, blocked_resource_types=BLOCKED_RESOURCE_TYPES,
+                 blocked_domains=BLOCKED_DOMAINS, wait_for='networkidle', selector_timeout=10000,
+                 extraction='dom', headless=False, storage_state_file='cr_session.json',
+                 session_max_age=12 * 3600, retry_policy=None, dead_letter_file='dead_letters.jsonl',
+                 field_spec=None, extended=False, base_url=None, metrics=None,
+                 recycle_after=500, context_recycle_after=5000, max_page_memory_mb=512, memory_check_every=50):
+        """
+        Args:
+            cache (ResultCache, optional): Store checked before each page visit and updated after it
+            block_resources (bool): Abort requests for blocked resource types and domains after login
+            blocked_resource_types (tuple): Playwright resource types to abort, e.g. 'image'
+            blocked_domains (tuple): Domains (and their subdomains) to abort requests to
+            wait_for (str): 'networkidle' to wait for the whole page, or 'selectors' to wait only for the score and MPG elements
+            selector_timeout (int): Milliseconds to wait for the score and MPG elements when wait_for is 'selectors'
+            extraction (str): 'dom' to read scores from the rendered page, or 'http' to first try the JSON
+                embedded in the page HTML over a plain HTTP request, falling back to the browser
+            headless (bool): Run Chromium without a visible window
+            storage_state_file (str): File the logged-in cookies and localStorage are saved to and reused from.
+                None logs in on every run
+            session_max_age (float): Seconds a saved login is reused before logging in again
+            retry_policy (RetryPolicy, optional): Backoff for vehicles that fail with a transient error
+            dead_letter_file (str): JSON Lines file that vehicles are written to once they run out of retries
+            field_spec (dict): Fields to read from each overview page, see field_extraction.FIELD_SPEC
+            extended (bool): Also read road-test, price, rating-bar and trouble-spot data from the same page
+                load, and return rows of the typed records.VehicleRecord schema
+            base_url (str): Site to scrape. Defaults to CR_BASE_URL
+            metrics (ScrapeMetrics, optional): Collects stage timings and counters. A new one is created if None
+            recycle_after (int): Navigations after which a page is closed and replaced by a fresh one. None never recycles
+            context_recycle_after (int): Navigations after which the whole browser context is replaced, keeping
+                the login cookies. None never recycles
+            max_page_memory_mb (float): JavaScript heap size above which a page is replaced early. None disables the check
+            memory_check_every (int): Navigations between memory checks of a page
+        """
+        self.base_url = (base_url or CR_BASE_URL).rstrip('/')
         self.username = os.getenv('CR_USERNAME')
         self.password = os.getenv('CR_PASSWORD')
+        self.cache = cache
+        self.block_resources = block_resources
+        self.blocked_resource_types = set(blocked_resource_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.wait_for = wait_for
+        self.selector_timeout = selector_timeout
+        self.extraction = extraction
+        self.headless = headless
+        self.storage_state_file = storage_state_file
+        self.session_max_age = session_max_age
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.dead_letters = DeadLetterQueue(dead_letter_file)
+        self.extended = extended
+        self.field_spec = field_spec or (EXTENDED_FIELD_SPEC if extended else FIELD_SPEC)
+        self.metrics = metrics or ScrapeMetrics()
+        self.recycle_after = recycle_after
+        self.context_recycle_after = context_recycle_after
+        self.max_page_memory_mb = max_page_memory_mb
+        self.memory_check_every = memory_check_every
+        self.http = None
         self.playwright = None
         self.browser = None
+        self.context = None
         self.page = None
+        self.worker_pages = []
+        self._navigations = {}  # page -> navigations since it was opened
+        self._context_navigations = 0
+        self._crashed_pages = set()
         
-    def start_session(self):
-        """Initialize the browser session and login"""
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=False)
-        self.page = self.browser.new_page()
+    def start_session(self, force_login=False):
+        """Initialize the browser session and login
         
-        try:
-            # Navigate to main page
-            self.page.goto('https://www.consumerreports.org/')
+        A saved login from storage_state_file is reused while it is still
+        valid, so only the first run (or the first after it expires) goes
+        through the sign-in page. A saved login is checked with one page load
+        before it is used, so a session revoked by the site is replaced.
+        
+        Args:
+            force_login (bool): Sign in again even if a saved login is valid
+        """
+        with self.metrics.time('start_session'):
+            # Imported here so that planning and catalog work don't pay for loading Playwright
+            from playwright.sync_api import sync_playwright
+            self.playwright = sync_playwright().start()
+            self.browser = self.playwright.chromium.launch(headless=self.headless)
+        
+            if not force_login and self._saved_session_is_valid():
+                self.context = self.browser.new_context(storage_state=self.storage_state_file)
+                self.page = self._new_page()
+                # Blocking first keeps the check to the HTML of one page
+                self._block_requests()
+                if self._is_signed_in():
+                    print("Reusing saved login session")
+                    self._prepare_context(block_requests=False)
+                    return True
+                print("Saved login session was signed out, logging in again")
+                self.context.close()
+        
+            # All worker pages are opened in this context so they share the login cookies
+            self.context = self.browser.new_context()
+            self.page = self._new_page()
+        
+            try:
+                # Navigate to main page
+                self.page.goto(f'{self.base_url}/')
+            
+                # Click Sign In button
+                self.page.click(SIGN_IN_SELECTOR)
             
-            # Click Sign In button
-            self.page.click('span.cda-gnav__main-sign-in')
+                # Wait for login fields
+                self.page.wait_for_selector('#gnav-signin-username')
             
-            # Wait for login fields
-            self.page.wait_for_selector('#gnav-signin-username')
+                # Input credentials
+                self.page.locator('#gnav-signin-username').fill(str(self.username))
+                self.page.wait_for_timeout(500)
+                self.page.locator('#gnav-signin-password').fill(str(self.password))
             
-            # Input credentials
-            self.page.locator('#gnav-signin-username').fill(str(self.username))
-            self.page.wait_for_timeout(500)
-            self.page.locator('#gnav-signin-password').fill(str(self.password))
+                # Submit login
+                self.page.click('#gnav-signin-submit')
             
-            # Submit login
-            self.page.click('#gnav-signin-submit')
+                # Wait for login
+                self.page.wait_for_load_state('networkidle', timeout=10000)
+                print("Successfully logged in")
             
-            # Wait for login
-            self.page.wait_for_load_state('networkidle', timeout=10000)
-            print("Successfully logged in")
-            return True
+                self._save_storage_state()
+                self._prepare_context()
+                return True
             
+            except Exception as e:
+                print(f"Error during login: {e}")
+                self.close_session()
+                return False
+    
+    def _saved_session_is_valid(self):
+        """Check the saved login without touching the network
+        
+        The file must be younger than session_max_age, and none of its
+        cookies for the site may have expired.
+        """
+        if not self.storage_state_file or not os.path.exists(self.storage_state_file):
+            return False
+        if time.time() - os.path.getmtime(self.storage_state_file) > self.session_max_age:
+            return False
+        try:
+            with open(self.storage_state_file, 'r') as f:
+                cookies = json.load(f).get('cookies', [])
         except Exception as e:
-            print(f"Error during login: {e}")
-            self.close_session()
+            print(f"Error reading saved session: {e}")
             return False
+        
+        site = urlparse(self.base_url).hostname or ''
+        site = site[4:] if site.startswith('www.') else site
+        site_cookies = [cookie for cookie in cookies if site in cookie.get('domain', '')]
+        now = time.time()
+        return bool(site_cookies) and all(
+            cookie.get('expires', -1) < 0 or cookie['expires'] > now for cookie in site_cookies
+        )
     
-    def scrape_vehicle(self, make, model, year, vehicle_data=None):
+    def _save_storage_state(self):
+        """Save the login to storage_state_file
+
+        Written to a temporary file first, so shard processes logging in at
+        the same time never leave a half-written file for each other.
+        """
+        if not self.storage_state_file:
+            return
+        tmp_file = f'{self.storage_state_file}.{os.getpid()}.tmp'
+        self.context.storage_state(path=tmp_file)
+        os.replace(tmp_file, self.storage_state_file)
+    
+    def _is_signed_in(self):
+        """Load the home page's HTML once and check that the site sees the session as signed in"""
+        try:
+            self.page.goto(f'{self.base_url}/', wait_until='domcontentloaded')
+            return self.page.query_selector(SIGN_IN_SELECTOR) is None
+        except Exception as e:
+            print(f"Error checking saved session: {e}")
+            return False
+    
+    def _prepare_context(self, block_requests=True):
+        """Set up request filtering and the HTTP session once logged in"""
+        if block_requests:
+            self._block_requests()
+        # The embedded JSON only covers the basic fields, so extended mode always renders the page
+        if self.extraction == 'http' and not self.extended:
+            self._start_http_session()
+    
+    def _block_requests(self):
+        """Abort blocked resource types and domains in the current context, if block_resources is set"""
+        if self.block_resources:
+            self.context.route('**/*', self._filter_request)
+    
+    def _start_http_session(self):
+        """Create an HTTP session that reuses the browser's login cookies"""
+        import requests
+        self.http = requests.Session()
+        self.http.headers['User-Agent'] = self.page.evaluate('navigator.userAgent')
+        for cookie in self.context.cookies():
+            self.http.cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+    
+    def _fetch_vehicle_http(self, make, model, year):
+        """Read a vehicle's scores from the JSON embedded in its overview page
+        
+        Returns:
+            dict: Scraped vehicle data, or None if the page has no usable payload
+        
+        Raises:
+            EmptyPageError: If the vehicle has no overview page
+            ScrapeError: If the site throttled or failed (429, 5xx), so the caller backs off
+                instead of sending the same request through the browser
+        """
+        try:
+            with self.metrics.time('http_fetch'):
+                response = self.http.get(self._overview_url(make, model, year), timeout=30)
+            check_response(response)
+            self._check_landing(response, make, model, year)
+            response.raise_for_status()
+            result = parse_overview_html(response.text, make, model, year)
+        except ScrapeError as e:
+            if isinstance(e, EmptyPageError) or e.transient:
+                raise
+            print(f"HTTP extraction failed for {make} {model} {year}: {e}")
+            return None
+        except Exception as e:
+            print(f"HTTP extraction failed for {make} {model} {year}: {e}")
+            return None
+        
+        if result is None:
+            print(f"No embedded scores for {make} {model} {year}, falling back to the browser")
+            return None
+        print(f"Scraped: {make} {model} {year} - Reliability: {result['reliability_score']}, Satisfaction: {result['satisfaction_score']}, MPG: {result['owner_reported_mpg']}")
+        return result
+    
+    def _filter_request(self, route):
+        """Abort requests for blocked resource types and domains"""
+        request = route.request
+        if request.resource_type in self.blocked_resource_types:
+            return route.abort()
+        host = urlparse(request.url).hostname or ''
+        if any(host == domain or host.endswith('.' + domain) for domain in self.blocked_domains):
+            return route.abort()
+        return route.continue_()
+    
+    def _wait_until_ready(self, page):
+        """Wait until an overview page can be read
+        
+        With wait_for='selectors', returns as soon as a score or MPG element
+        is in the DOM instead of waiting for the network to go idle. Pages
+        without any ratings are read after selector_timeout, unless they show
+        the no-ratings placeholder, which ends the wait right away. A timeout
+        is not an error here: _extract_vehicle decides what an empty page means.
+        
+        Raises:
+            EmptyPageError: If the page shows the no-ratings placeholder once the HTML is parsed
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        with self.metrics.time('load_wait'):
+            page.wait_for_load_state('domcontentloaded')
+            if page.query_selector(NO_RATINGS_SELECTOR):
+                raise EmptyPageError("No ratings on page")
+            
+            if self.wait_for != 'selectors':
+                page.wait_for_load_state('networkidle')
+                return
+            
+            try:
+                page.wait_for_selector(f'{SCORE_SELECTOR}, {MPG_SELECTOR}, {NO_RATINGS_SELECTOR}', state='attached',
+                                       timeout=self.selector_timeout)
+            except PlaywrightTimeoutError:
+                pass
+    
+    def scrape_vehicle(self, make, model, year, vehicle_data=None, force_refresh=False):
         """Scrape data for a specific vehicle from the overview page
         
         Args:
@@ -54,6 +310,7 @@ class ConsumerReportsScraper:
             model (str): Vehicle model
             year (int): Vehicle year
             vehicle_data (dict, optional): Pre-loaded vehicle data to validate year availability
+            force_refresh (bool): Visit the page even if the cache has a fresh result
             
         Returns:
             dict: Scraped vehicle data or None if unavailable/invalid
@@ -62,164 +319,543 @@ class ConsumerReportsScraper:
             print("No active session. Call start_session() first.")
             return None
             
-        # Check if year is available for this make/model if vehicle_data is provided
-        if vehicle_data:
+        resolved = self._resolve_vehicle(make, model, year, vehicle_data)
+        if not resolved:
+            return None
+        make, model = resolved
+        
+        cached = self._cached_result(make, model, year, force_refresh)
+        if cached:
+            return cached
+        if self._known_empty(make, model, year, force_refresh):
+            return None
+        
+        if self.http:
             try:
-                if make in vehicle_data and model in vehicle_data[make]:
-                    available_years = vehicle_data[make][model]
-                    # Ensure year is an integer for comparison
-                    year_int = int(year) if not isinstance(year, int) else year
-                    if year_int not in available_years:
-                        print(f"Skipping {make} {model} {year} - Year not available in Consumer Reports")
-                        #print(f"Available years: {available_years}")
-                        return None
-                else:
-                    # Check for case-insensitive matches
-                    found_make = False
-                    found_model = False
-                    
-                    for data_make in vehicle_data.keys():
-                        if data_make.lower() == make.lower():
-                            found_make = True
-                            make_key = data_make
-                            
-                            for data_model in vehicle_data[data_make].keys():
-                                if data_model.lower() == model.lower():
-                                    found_model = True
-                                    model_key = data_model
-                                    
-                                    # Found matching make/model with different case
-                                    available_years = vehicle_data[make_key][model_key]
-                                    year_int = int(year) if not isinstance(year, int) else year
-                                    if year_int in available_years:
-                                        print(f"Found case-insensitive match: {make_key} {model_key} {year}")
-                                        # Update make/model to match the case in the data
-                                        make = make_key
-                                        model = model_key
-                                        break
-                                    else:
-                                        print(f"Skipping {make} {model} {year} - Year not available in Consumer Reports")
-                                        #print(f"Available years: {available_years}")
-                                        return None
-                            
-                            if not found_model:
-                                print(f"Skipping {make} {model} {year} - Model not available in Consumer Reports")
-                                #print(f"Available models for {make_key}: {list(vehicle_data[make_key].keys())}")
-                                return None
-                            break
-                    
-                    if not found_make:
-                        print(f"Skipping {make} {model} {year} - Make not available in Consumer Reports")
-                        #print(f"Available makes: {list(vehicle_data.keys())}")
-                        return None
-            except Exception as e:
-                print(f"Error checking vehicle availability: {e}")
-                print(f"Will attempt to scrape {make} {model} {year} anyway")
-                # Continue with scraping attempt if data validation fails
+                result = self._fetch_vehicle_http(make, model, year)
+            except EmptyPageError as e:
+                self._store_empty(make, model, year, e)
+                return None
+            except ScrapeError as e:
+                print(f"Error scraping {make} {model} {year}: {e}")
+                self.metrics.count('failed')
+                return None
+            if result:
+                self._store_result(result)
+                return result
+        
+        if self._context_needs_recycling():
+            self._recycle_context()
+        else:
+            self._maintain_page(self.page)
         
         try:
             # Navigate to car overview page
-            url = f'https://www.consumerreports.org/cars/{make.lower()}/{model.lower()}/{year}/overview'
-            self.page.goto(url)
+            response = self._open_overview(self.page, make, model, year)
+            check_response(response)
+            self._check_landing(response, make, model, year)
             
             # Wait for page to load
-            self.page.wait_for_load_state('networkidle')
+            self._wait_until_ready(self.page)
             
-            # Find all score elements
-            score_elements = self.page.query_selector_all('span.crux-body-copy.crux-body-copy--extra-small--bold.bar-ratings-chart__score')
-            
-            reliability_score = 'N/A'
-            satisfaction_score = 'N/A'
-            
-            # Try to find reliability and satisfaction scores
-            for i, element in enumerate(score_elements):
-                text = element.inner_text().strip()
-                # Use position to determine which score we're looking at
-                if i == 0:  # First score is usually reliability
-                    reliability_score = text
-                elif i == 1:  # Second score is usually satisfaction
-                    satisfaction_score = text
-            
-            # Find owner reported MPG and extract just the number
-            mpg_element = self.page.query_selector('div.fuel-efficiency-component__text-box.qa-qwner-reported-mpg b')
-            if mpg_element:
-                mpg_text = mpg_element.inner_text().strip()
-                # Extract just the number from text like "26 MPG"
-                import re
-                mpg_match = re.search(r'(\d+)', mpg_text)
-                owner_reported_mpg = mpg_match.group(1) if mpg_match else mpg_text
-            else:
-                owner_reported_mpg = 'N/A'
-            
-            result = {
-                'make': make,
-                'model': model,
-                'year': year,
-                'reliability_score': reliability_score,
-                'satisfaction_score': satisfaction_score,
-                'owner_reported_mpg': owner_reported_mpg
-            }
-            
-            print(f"Scraped: {make} {model} {year} - Reliability: {reliability_score}, Satisfaction: {satisfaction_score}, MPG: {owner_reported_mpg}")
+            result = self._extract_vehicle(self.page, make, model, year)
+            self._store_result(result)
             return result
         
+        except EmptyPageError as e:
+            self._store_empty(make, model, year, e)
+            return None
         except Exception as e:
             print(f"Error scraping {make} {model} {year}: {e}")
+            self.metrics.count('failed')
+            return None
+    
+    def _resolve_vehicle(self, make, model, year, vehicle_data=None):
+        """Check a vehicle against the available vehicle data
+        
+        Args:
+            make (str): Vehicle make (manufacturer)
+            model (str): Vehicle model
+            year (int): Vehicle year
+            vehicle_data (CatalogIndex or dict, optional): Catalog used to validate year availability
+            
+        Returns:
+            tuple: (make, model) spelled as in the catalog, or None if unavailable
+        """
+        if not vehicle_data:
+            return make, model
+        
+        try:
+            index = vehicle_data if isinstance(vehicle_data, CatalogIndex) else CatalogIndex(vehicle_data)
+            entry = index.lookup(make, model)
+            if entry is None:
+                missing = 'Model' if index.has_make(make) else 'Make'
+                print(f"Skipping {make} {model} {year} - {missing} not available in Consumer Reports")
+                self.metrics.count('skipped')
+                return None
+            
+            catalog_make, catalog_model, available_years = entry
+            if not has_year(available_years, int(year)):
+                print(f"Skipping {make} {model} {year} - Year not available in Consumer Reports")
+                self.metrics.count('skipped')
+                return None
+            return catalog_make, catalog_model
+        except Exception as e:
+            print(f"Error checking vehicle availability: {e}")
+            print(f"Will attempt to scrape {make} {model} {year} anyway")
+            # Continue with scraping attempt if data validation fails
+            return make, model
+    
+    def _cached_result(self, make, model, year, force_refresh=False):
+        """Return the cached result for a vehicle, or None if it needs scraping"""
+        if not self.cache or force_refresh:
+            return None
+        cached = self.cache.get(make, model, year)
+        if cached and self.extended and 'schema_version' not in cached:
+            # Scraped without the extended fields
             return None
+        if cached:
+            print(f"Cached: {make} {model} {year}")
+            self.metrics.count('cached')
+        return cached
+    
+    def _store_result(self, result):
+        """Count a freshly scraped result and save it to the cache"""
+        self.metrics.count('scraped')
+        if self.cache:
+            self.cache.put(result)
     
-    def scrape_multiple_vehicles(self, vehicles_list):
+    def _known_empty(self, make, model, year, force_refresh=False):
+        """Whether the negative cache says the vehicle's page has no ratings"""
+        if not self.cache or force_refresh:
+            return False
+        reason = self.cache.get_empty(make, model, year)
+        if reason:
+            print(f"Known empty: {make} {model} {year} ({reason})")
+            self.metrics.count('empty')
+        return bool(reason)
+    
+    def _store_empty(self, make, model, year, error):
+        """Put a vehicle without ratings in the negative cache"""
+        print(f"No ratings: {make} {model} {year} ({error})")
+        self.metrics.count('empty')
+        if self.cache:
+            self.cache.put_empty(make, model, year, str(error))
+    
+    def _check_landing(self, response, make, model, year):
+        """Check where a request for the overview page ended up
+        
+        Consumer Reports sends years without an overview to the model's landing
+        page, so only that redirect means the vehicle has no ratings. Any other
+        destination, such as the sign-in page after the session expired, a
+        consent page or a bot challenge, says nothing about the vehicle.
+        
+        Raises:
+            EmptyPageError: If the request was redirected to the model's landing page
+            ScrapeError: If it was redirected anywhere else. Transient, so the vehicle is retried
+        """
+        if response is None:
+            return
+        expected = urlparse(self._overview_url(make, model, year)).path.rstrip('/').lower()
+        landed = urlparse(response.url).path.rstrip('/').lower()
+        if landed == expected:
+            return
+        if landed == f'/cars/{normalize_name(make)}/{normalize_name(model)}':
+            raise EmptyPageError(f"Redirected to {response.url}")
+        raise ScrapeError(f"Redirected to {response.url}, not the overview or model page", transient=True)
+    
+    def _overview_url(self, make, model, year):
+        return f'{self.base_url}/cars/{normalize_name(make)}/{normalize_name(model)}/{year}/overview'
+    
+    def _open_overview(self, page, make, model, year):
+        """Start navigating a page to the car overview URL
+        
+        Only waits for the navigation to commit, so several pages can be
+        loading at the same time. Callers wait for the load state themselves.
+        
+        Returns:
+            Response: Playwright response for the navigation
+        """
+        self._navigations[page] = self._navigations.get(page, 0) + 1
+        self._context_navigations += 1
+        with self.metrics.time('navigate'):
+            return page.goto(self._overview_url(make, model, year), wait_until='commit')
+    
+    def _extract_vehicle(self, page, make, model, year):
+        """Read the scores from a loaded overview page
+        
+        All fields of field_spec are read in one page.evaluate call.
+        
+        Returns:
+            dict: Scraped vehicle data
+        
+        Raises:
+            EmptyPageError: If none of the fields are on the page, e.g. an all-N/A page
+            ScrapeError: If none of the fields are on the page and it shows the sign-in button, so the
+                session is logged out. Transient, so the vehicle is retried instead of being cached as empty
+        """
+        with self.metrics.time('extract'):
+            fields = extract_fields(page, self.field_spec)
+        if not has_values(fields):
+            if page.query_selector(SIGN_IN_SELECTOR):
+                raise ScrapeError("No scores on page, signed out", transient=True)
+            raise EmptyPageError("No ratings on page")
+        result = {'make': make, 'model': model, 'year': year, **fields}
+        if self.extended:
+            result = VehicleRecord.from_scrape(result).to_row()
+        
+        print(f"Scraped: {make} {model} {year} - Reliability: {result.get('reliability_score')}, Satisfaction: {result.get('satisfaction_score')}, MPG: {result.get('owner_reported_mpg')}")
+        return result
+    
+    def scrape_multiple_vehicles(self, vehicles_list, **options):
         """Scrape multiple vehicles and return results as a DataFrame
         
+        Keeps every result in memory and needs pandas. Use scrape_to_writer
+        to stream results to disk instead.
+        
         Args:
-            vehicles_list: List of dicts with keys 'make', 'model', 'year'
+            vehicles_list: Iterable of dicts with keys 'make', 'model', 'year', e.g. from vehicle_catalog.plan_vehicles
+            **options: Keyword arguments for iter_vehicles
         
         Returns:
             pandas.DataFrame with results
         """
-        if not self.start_session():
-            return pd.DataFrame()
-            
-        results = []
+        import pandas as pd
+        results = list(self.iter_vehicles(vehicles_list, **options))
+        
+        # Convert to DataFrame
+        df = pd.DataFrame(results)
+        return df
+    
+    def scrape_to_writer(self, vehicles_list, writer, total=None, **options):
+        """Scrape multiple vehicles and stream each result to a writer as it arrives
+        
+        Vehicles already in the writer's output (when it was opened with
+        resume=True) are skipped.
         
-        # Load vehicle data for validation
-        vehicle_data = self.load_vehicle_data()
+        Args:
+            vehicles_list: Iterable of dicts with keys 'make', 'model', 'year', e.g. from vehicle_catalog.plan_vehicles
+            writer (ResultWriter): Output writer from output_writers.open_writer
+            total (int): Number of vehicles in vehicles_list, for the ETA when it is a generator.
+                Defaults to len(vehicles_list) if it has one
+            **options: Keyword arguments for iter_vehicles
+        
+        Returns:
+            int: Number of results written
+        """
+        done = set(writer.completed_keys)
+        if total is None and hasattr(vehicles_list, '__len__'):
+            total = len(vehicles_list)
+        
+        def remaining():
+            for vehicle in vehicles_list:
+                if result_key(vehicle) not in done:
+                    yield vehicle
+                elif self.metrics.total:
+                    # Already written, so it is not part of the run
+                    self.metrics.total -= 1
+        
+        count = 0
+        for result in self.iter_vehicles(remaining(), total=total, **options):
+            with self.metrics.time('write'):
+                writer.write(result)
+            count += 1
+        return count
+    
+    def iter_vehicles(self, vehicles_list, workers=1, requests_per_second=1.0, max_requests_per_second=None,
+                      force_refresh=False, total=None, on_outcome=None):
+        """Scrape multiple vehicles, yielding each result as soon as it is ready
+        
+        With more than one worker, that many pages are opened in the logged-in
+        browser context and their page loads overlap. Navigations are paced by
+        an adaptive rate limit that backs off when the site throttles, errors
+        or slows down, and climbs back up to max_requests_per_second.
+        
+        Args:
+            vehicles_list: Iterable of dicts with keys 'make', 'model', 'year', e.g. from vehicle_catalog.plan_vehicles
+            workers (int): Number of pages loading vehicles concurrently
+            requests_per_second (float): Starting number of navigations per second across all workers
+            max_requests_per_second (float): Highest rate to climb to. Defaults to requests_per_second
+            force_refresh (bool): Visit every page even if the cache has a fresh result
+            total (int): Number of vehicles, for the ETA on the progress line. Defaults to len(vehicles_list) if it has one
+            on_outcome (callable): Called with the vehicle dict and 'empty', 'failed' or 'skipped' for
+                each vehicle that is done without a result: no ratings, dead-lettered, or not in the catalog
+        
+        Yields:
+            dict: Scraped vehicle data, in the same order as vehicles_list except for retried vehicles
+        """
+        if not self.page and not self.start_session():
+            return
+        
+        # Load the Consumer Reports catalog for validation
+        vehicle_data = self.load_catalog_index()
         if not vehicle_data:
             print("Warning: Could not load vehicle data for validation. Will attempt to scrape all vehicles.")
         
-        for vehicle in vehicles_list:
-            result = self.scrape_vehicle(
-                vehicle['make'], 
-                vehicle['model'], 
-                vehicle['year'],
-                vehicle_data
-            )
+        limiter = AdaptiveRateLimiter(requests_per_second, max_rate=max_requests_per_second)
+        if total is None and hasattr(vehicles_list, '__len__'):
+            total = len(vehicles_list)
+        self.metrics.start_run(total)
+        try:
+            yield from self._scrape_pipelined(vehicles_list, vehicle_data, workers, limiter, force_refresh, on_outcome)
+        finally:
+            print(self.metrics.summary())
+            if self.metrics.export_file:
+                self.metrics.write()
+    
+    def _scrape_pipelined(self, vehicles_list, vehicle_data, workers, limiter, force_refresh=False, on_outcome=None):
+        """Yield scraped vehicles while up to ``workers`` pages load in parallel
+        
+        Navigations are issued in input order and pages are read back in the
+        order they were issued, so results come out in input order. Cached
+        results are queued in the same order without using a page. Vehicles
+        that fail with a transient error are retried after a backoff, so they
+        come out later. Vehicles that run out of retries go to the dead-letter file.
+        Vehicles that end without a result are reported to ``on_outcome``.
+        """
+        pages = self._worker_pages(workers)
+        idle = deque(pages)
+        in_flight = deque()
+        retries = []  # heap of (due time, sequence, make, model, year, attempt)
+        sequence = itertools.count()
+        vehicles = iter(vehicles_list)
+        exhausted = False
+        
+        def report(make, model, year, outcome):
+            if on_outcome:
+                on_outcome({'make': make, 'model': model, 'year': year}, outcome)
+        
+        def fail(make, model, year, attempt, error):
+            if isinstance(error, EmptyPageError):
+                # The site answered fine, there is just nothing to read
+                limiter.record()
+                self._store_empty(make, model, year, error)
+                report(make, model, year, 'empty')
+                return
+            limiter.record(error=error)
+            if self.retry_policy.should_retry(attempt, error):
+                delay = self.retry_policy.delay(attempt)
+                print(f"Error scraping {make} {model} {year}: {error} - retrying in {delay:.1f}s")
+                heapq.heappush(retries, (time.monotonic() + delay, next(sequence), make, model, year, attempt + 1))
+                self.metrics.count('retried')
+            else:
+                self.dead_letters.add(make, model, year, error, attempt)
+                self.metrics.count('failed')
+                report(make, model, year, 'failed')
+        
+        while True:
+            # A worn-out context is swapped once no page is loading. Until then no new navigations start
+            draining = self._context_needs_recycling()
+            if draining and len(idle) == len(pages):
+                self._recycle_context()
+                pages = self._worker_pages(workers)
+                idle = deque(pages)
+                draining = False
             
-            if result:
-                results.append(result)
+            # Keep every idle page busy with a due retry or the next valid vehicle
+            while idle and not draining and len(in_flight) < 4 * len(pages):
+                if retries and retries[0][0] <= time.monotonic():
+                    _, _, make, model, year, attempt = heapq.heappop(retries)
+                elif not exhausted:
+                    vehicle = next(vehicles, None)
+                    if vehicle is None:
+                        exhausted = True
+                        continue
+                    
+                    make, model, year = vehicle['make'], vehicle['model'], vehicle['year']
+                    attempt = 1
+                    resolved = self._resolve_vehicle(make, model, year, vehicle_data)
+                    if not resolved:
+                        report(make, model, year, 'skipped')
+                        continue
+                    make, model = resolved
+                    
+                    cached = self._cached_result(make, model, year, force_refresh)
+                    if cached:
+                        in_flight.append((None, make, model, year, cached, attempt, None))
+                        continue
+                    if self._known_empty(make, model, year, force_refresh):
+                        report(make, model, year, 'empty')
+                        continue
+                else:
+                    break
+                
+                if self.http:
+                    with self.metrics.time('rate_limit_wait'):
+                        limiter.wait()
+                    started = time.monotonic()
+                    try:
+                        fetched = self._fetch_vehicle_http(make, model, year)
+                    except ScrapeError as e:
+                        # Throttling and server errors back the rate off, the same as for the browser
+                        fail(make, model, year, attempt, e)
+                        continue
+                    limiter.record(latency=time.monotonic() - started)
+                    if fetched:
+                        self._store_result(fetched)
+                        in_flight.append((None, make, model, year, fetched, attempt, None))
+                        continue
+                
+                page = idle.popleft()
+                with self.metrics.time('rate_limit_wait'):
+                    limiter.wait()
+                started = time.monotonic()
+                try:
+                    response = self._open_overview(page, make, model, year)
+                    check_response(response)
+                    self._check_landing(response, make, model, year)
+                except Exception as e:
+                    idle.appendleft(self._maintain_page(page))
+                    fail(make, model, year, attempt, e)
+                    continue
+                in_flight.append((page, make, model, year, None, attempt, started))
             
-            # Optional: Add a small delay between requests
-            time.sleep(1)
+            if not in_flight:
+                if not retries:
+                    break
+                # Nothing loading, so wait for the next retry to come due
+                with self.metrics.time('retry_wait'):
+                    time.sleep(max(0.0, retries[0][0] - time.monotonic()))
+                continue
+            
+            # Read back the oldest navigation
+            page, make, model, year, result, attempt, started = in_flight.popleft()
+            if page is not None:
+                try:
+                    self._wait_until_ready(page)
+                    result = self._extract_vehicle(page, make, model, year)
+                except Exception as e:
+                    result = None
+                    fail(make, model, year, attempt, e)
+                else:
+                    limiter.record(latency=time.monotonic() - started)
+                    self._store_result(result)
+                idle.append(self._maintain_page(page))
+            
+            if result:
+                yield result
+    
+    def _worker_pages(self, workers):
+        """Pages for loading ``workers`` vehicles at once
         
-        # Convert to DataFrame
-        df = pd.DataFrame(results)
-        return df
+        Extra pages are opened in the logged-in context on first use and kept
+        until the session is closed, so a long-lived scraper reuses them.
+        """
+        while len(self.worker_pages) < max(1, workers) - 1:
+            self.worker_pages.append(self._new_page())
+        return [self.page] + self.worker_pages[:max(1, workers) - 1]
+    
+    def _new_page(self):
+        """Open a page in the current context, watching it for renderer crashes"""
+        page = self.context.new_page()
+        page.on('crash', self._crashed_pages.add)
+        return page
+    
+    def _maintain_page(self, page):
+        """Replace a page that crashed, was closed, has been used too long or uses too much memory
+        
+        Long-lived pages slowly accumulate memory in the renderer. A fresh page
+        in the same context keeps the login, so swapping it in is cheap.
+        
+        Returns:
+            Page: The page to keep using, either the same one or its replacement
+        """
+        navigations = self._navigations.get(page, 0)
+        if page in self._crashed_pages or page.is_closed():
+            reason = 'crashed'
+        elif self.recycle_after and navigations >= self.recycle_after:
+            reason = f'{navigations} navigations'
+        elif (self.max_page_memory_mb and self.memory_check_every and navigations
+              and navigations % self.memory_check_every == 0):
+            heap_mb = self._page_memory_mb(page)
+            if heap_mb is None or heap_mb <= self.max_page_memory_mb:
+                return page
+            reason = f'{heap_mb:.0f} MB heap'
+        else:
+            return page
+        return self._replace_page(page, reason)
+    
+    def _page_memory_mb(self, page):
+        """JavaScript heap in use by a page, in MB, or None if it can't be read"""
+        try:
+            return page.evaluate('performance.memory ? performance.memory.usedJSHeapSize : null') / 1024 ** 2
+        except Exception:
+            return None
+    
+    def _replace_page(self, page, reason):
+        """Close a page and put a fresh one in its place in the worker pool"""
+        with self.metrics.time('recycle_page'):
+            print(f"Replacing page ({reason})")
+            new_page = self._new_page()
+            if page is self.page:
+                self.page = new_page
+            else:
+                self.worker_pages = [new_page if p is page else p for p in self.worker_pages]
+            self._navigations.pop(page, None)
+            self._crashed_pages.discard(page)
+            try:
+                page.close()
+            except Exception:
+                pass
+        return new_page
+    
+    def _context_needs_recycling(self):
+        return bool(self.context_recycle_after) and self._context_navigations >= self.context_recycle_after
+    
+    def _recycle_context(self):
+        """Replace the browser context and all its pages, carrying the login cookies over"""
+        with self.metrics.time('recycle_context'):
+            print(f"Replacing browser context after {self._context_navigations} navigations")
+            state = self.context.storage_state()
+            if self.http:
+                self.http.close()
+                self.http = None
+            self.context.close()
+            self.context = self.browser.new_context(storage_state=state)
+            self.page = self._new_page()
+            self.worker_pages = []
+            self._navigations.clear()
+            self._crashed_pages.clear()
+            self._context_navigations = 0
+            self._prepare_context()
     
-    def scrape_available_vehicles(self):
+    def scrape_available_vehicles(self, incremental=False, existing_file=CATALOG_FILE,
+                                  checkpoint_file='catalog_checkpoint.json', option_timeout=3000):
         """Scrape all available makes, models, and years from Consumer Reports
         
+        Progress is checkpointed after each make, and a crawl that was
+        interrupted resumes after the last completed make. In incremental
+        mode, a make whose model list matches existing_file keeps its
+        existing years instead of being crawled model by model. A make that
+        fails to load keeps its entry from existing_file in either mode, and
+        is left out of the checkpoint so a resumed crawl tries it again.
+        
+        Args:
+            incremental (bool): Only crawl the models of makes whose model list changed
+            existing_file (str): Current catalog, compared against in incremental mode and used for makes that fail
+            checkpoint_file (str): File the partial result is saved to after each make. None disables checkpoints
+            option_timeout (int): Milliseconds to wait for a dropdown to show new options after a click
+        
         Returns:
-            dict: Nested dictionary with structure {make: {model: [years]}}
+            dict: Nested dictionary with structure {make: {model: [years]}}, or {} if the login failed
+        
+        Raises:
+            Exception: If the crawl stops before going through every make. The checkpoint is kept
+                so the next crawl resumes, and nothing partial is returned to be saved
         """
         if not self.page:
             if not self.start_session():
                 return {}
                 
         print("Starting to scrape available vehicles...")
-        result = {}
+        existing = self.load_vehicle_data(existing_file) if existing_file and os.path.exists(existing_file) else {}
+        result = self._load_checkpoint(checkpoint_file)
+        if result:
+            print(f"Resuming from checkpoint with {len(result)} makes done")
         
         try:
             # Navigate to cars page
-            self.page.goto('https://www.consumerreports.org/cars/')
+            self.page.goto(f'{self.base_url}/cars/')
             self.page.wait_for_load_state('networkidle')
             
             # Click on Select Make button - using the selector class instead of text
@@ -229,17 +865,18 @@ class ConsumerReportsScraper:
             self.page.wait_for_selector('.cr-cf-chunked-options__item')
             
             # Get all available makes
-            make_elements = self.page.query_selector_all('.cr-cf-chunked-options__item')
-            makes = [element.inner_text().strip() for element in make_elements]
+            makes = self._read_options('.cr-cf-chunked-options__item')
             print(f"Found {len(makes)} makes")
             print (makes)
 
 
             self.page.click('h1')
+            failed = []
             # Iterate through each make
             for make in makes:
+                if make in result:
+                    continue
                 print(f"Processing make: {make}")
-                result[make] = {}
                 
                 # Click on Select Make button - using selector class instead of text
                 make_selector = self.page.query_selector('.cr-selector__title button.cr-selector__value')
@@ -248,6 +885,7 @@ class ConsumerReportsScraper:
                 self.page.wait_for_selector('.cr-cf-chunked-options__item')
                 
                 # Click on the specific make - more precise selector
+                self._mark_options_stale(MODEL_OPTION_SELECTOR)
                 try:
                     self.page.click(f'.cr-cf-chunked-options__item span.crux-body-copy:text-is("{make}")')
                 except Exception:
@@ -256,110 +894,157 @@ class ConsumerReportsScraper:
                         Array.from(document.querySelectorAll('.cr-cf-chunked-options__item span.crux-body-copy'))
                             .find(el => el.textContent.trim() === "{make}")?.closest('.cr-cf-chunked-options__item')?.click();
                     ''')
-                self.page.wait_for_timeout(1000)  # Add small delay after click
-                #self.page.click('h1')
-                # Click on Select Model button
+                self._wait_for_fresh_options(MODEL_OPTION_SELECTOR, option_timeout)
+                
                 try:
-                    #self.page.wait_for_selector('button.cr-selector__value:has-text("Select Model ")', timeout=5000)
-                    #self.page.click('button.cr-selector__value:has-text("Select Model ")')
-                    #self.page.wait_for_selector('.cr-cf-chunked-options__item')
-                    
                     # Get all available models for this make using a more specific selector
                     # Target the model options container specifically to avoid getting makes again
-                    model_elements = self.page.query_selector_all('.cr-cf-model-options .cr-cf-chunked-options__item')
-                    models = [element.inner_text().strip() for element in model_elements]
+                    models = self._read_options(MODEL_OPTION_SELECTOR)
                     print(f"  Found {len(models)} models for {make}")
-                    print (models)
-
-                    # Iterate through each model
-                    for model in models:
-                        print(f"  Processing model: {model}")
-                        
-                        # Click on Select Model button using selector classes
-                        #model_selector = self.page.query_selector_all('.cr-selector__title button.cr-selector__value')[1]
-                        #if model_selector:
-                        #    model_selector.click()
-                        #self.page.wait_for_selector('.cr-cf-chunked-options__item')
-                        
-                        # Click on the specific model - more precise selector
-                        try:
-                            # First approach: Try to find and click the model element using a basic selector
-                            model_selector = f'.cr-cf-model-options .cr-cf-chunked-options__item:has-text("{model}")'
-                            if self.page.query_selector(model_selector):
-                                self.page.click(model_selector)
-                            else:
-                                # Second approach: Use JavaScript for more flexible text matching
-                                self.page.evaluate(f'''
-                                    Array.from(document.querySelectorAll('.cr-cf-model-options .cr-cf-chunked-options__item'))
-                                        .find(el => el.textContent.trim() === "{model}")?.click();
-                                ''')
-                        except Exception as e:
-                            print(f"    Error clicking model {model}: {e}")
-                            # Third approach: Direct JavaScript DOM traversal and click
-                            try:
-                                self.page.evaluate(f'''
-                                    (function() {{
-                                        const modelItems = document.querySelectorAll('.cr-cf-model-options .cr-cf-chunked-options__item');
-                                        for (let item of modelItems) {{
-                                            const text = item.textContent.trim();
-                                            if (text === "{model}") {{
-                                                item.click();
-                                                return true;
-                                            }}
-                                        }}
-                                        return false;
-                                    }})();
-                                ''')
-                            except Exception as e2:
-                                print(f"    All attempts to click model {model} failed: {e2}")
-                        
-                        self.page.wait_for_timeout(1000)  # Add small delay after click
-                        
-                        # Click on Year button
-                        try:
-                            # Click on Year button using selector classes
-                            #year_selector = self.page.query_selector_all('.cr-selector__title button.cr-selector__value')[2]
-                            #if year_selector:
-                            #    year_selector.click()
-                            #self.page.wait_for_selector('.cr-cf-grouped-options__item')
-                            
-                            # Get all available years for this model
-                            year_elements = self.page.query_selector_all('.cr-cf-grouped-options__item')
-                            years = [int(element.inner_text().strip()) for element in year_elements]
-                            print(f"    Found {len(years)} years for {make} {model}")
-                            
-                            result[make][model] = years
-                            
-                            # Close the year dropdown by clicking outside
-                            self.page.click('h1')
-                        except Exception as e:
-                            print(f"    Error getting years for {make} {model}: {e}")
-                            result[make][model] = []
-
-                        # Use position-based selector for the model dropdown (second dropdown)
-                        # Wait for the selector to be available
-                        self.page.wait_for_selector('.cr-selector__title button.cr-selector__value', timeout=5000)
-                        
-                        # Get all selector buttons and click the second one (model selector)
-                        selector_buttons = self.page.query_selector_all('.cr-selector__title button.cr-selector__value')
-                        if len(selector_buttons) >= 2:
-                            # Click the model selector (second dropdown)
-                            selector_buttons[1].click()
-                        else:
-                            # If we can't find it by position, try JavaScript approach
-                            self.page.evaluate('''
-                                document.querySelectorAll('.cr-selector__title button.cr-selector__value')[1].click();
-                            ''')
-                            
-                        self.page.wait_for_selector('.cr-cf-chunked-options__item')
+                    
+                    if incremental and make in existing and set(models) == set(existing[make]):
+                        print(f"  Model list unchanged for {make}, keeping existing years")
+                        result[make] = existing[make]
+                    else:
+                        result[make] = self._scrape_model_years(make, models, option_timeout)
                 except Exception as e:
                     print(f"  Error getting models for {make}: {e}")
+                    failed.append(make)
+                    continue
+                
+                self._save_checkpoint(result, checkpoint_file)
             
+            for make in failed:
+                if make in existing:
+                    print(f"Keeping the existing models of {make}, which failed to load")
+                    result[make] = existing[make]
+                else:
+                    print(f"No models for {make}, which failed to load")
+            
+            # The crawl finished, so the next one starts from scratch
+            if checkpoint_file and os.path.exists(checkpoint_file):
+                os.remove(checkpoint_file)
             return result
             
         except Exception as e:
             print(f"Error scraping available vehicles: {e}")
-            return result
+            raise
+    
+    def _scrape_model_years(self, make, models, option_timeout):
+        """Click through each model of the selected make and read its years
+        
+        Returns:
+            dict: Years for each model, {model: [years]}
+        """
+        model_years = {}
+        
+        # Iterate through each model
+        for model in models:
+            print(f"  Processing model: {model}")
+            
+            # Click on the specific model - more precise selector
+            self._mark_options_stale(YEAR_OPTION_SELECTOR)
+            try:
+                # First approach: Try to find and click the model element using a basic selector
+                model_selector = f'{MODEL_OPTION_SELECTOR}:has-text("{model}")'
+                if self.page.query_selector(model_selector):
+                    self.page.click(model_selector)
+                else:
+                    # Second approach: Use JavaScript for more flexible text matching
+                    self.page.evaluate(f'''
+                        Array.from(document.querySelectorAll('{MODEL_OPTION_SELECTOR}'))
+                            .find(el => el.textContent.trim() === "{model}")?.click();
+                    ''')
+            except Exception as e:
+                print(f"    Error clicking model {model}: {e}")
+                # Third approach: Direct JavaScript DOM traversal and click
+                try:
+                    self.page.evaluate(f'''
+                        (function() {{
+                            const modelItems = document.querySelectorAll('{MODEL_OPTION_SELECTOR}');
+                            for (let item of modelItems) {{
+                                const text = item.textContent.trim();
+                                if (text === "{model}") {{
+                                    item.click();
+                                    return true;
+                                }}
+                            }}
+                            return false;
+                        }})();
+                    ''')
+                except Exception as e2:
+                    print(f"    All attempts to click model {model} failed: {e2}")
+            
+            self._wait_for_fresh_options(YEAR_OPTION_SELECTOR, option_timeout)
+            
+            try:
+                # Get all available years for this model
+                years = [int(year) for year in self._read_options(YEAR_OPTION_SELECTOR)]
+                print(f"    Found {len(years)} years for {make} {model}")
+                
+                model_years[model] = years
+                
+                # Close the year dropdown by clicking outside
+                self.page.click('h1')
+            except Exception as e:
+                print(f"    Error getting years for {make} {model}: {e}")
+                model_years[model] = []
+
+            # Use position-based selector for the model dropdown (second dropdown)
+            # Wait for the selector to be available
+            self.page.wait_for_selector('.cr-selector__title button.cr-selector__value', timeout=5000)
+            
+            # Get all selector buttons and click the second one (model selector)
+            selector_buttons = self.page.query_selector_all('.cr-selector__title button.cr-selector__value')
+            if len(selector_buttons) >= 2:
+                # Click the model selector (second dropdown)
+                selector_buttons[1].click()
+            else:
+                # If we can't find it by position, try JavaScript approach
+                self.page.evaluate('''
+                    document.querySelectorAll('.cr-selector__title button.cr-selector__value')[1].click();
+                ''')
+                
+            self.page.wait_for_selector('.cr-cf-chunked-options__item')
+        
+        return model_years
+    
+    def _read_options(self, selector):
+        """Read the text of every dropdown option in one round-trip"""
+        texts = self.page.eval_on_selector_all(selector, 'els => els.map(el => el.innerText)')
+        return [text.strip() for text in texts]
+    
+    def _mark_options_stale(self, selector):
+        """Tag the current dropdown options so that re-rendered ones can be told apart"""
+        self.page.evaluate('sel => document.querySelectorAll(sel).forEach(el => el.dataset.crStale = "1")', selector)
+    
+    def _wait_for_fresh_options(self, selector, timeout):
+        """Wait until the dropdown shows options rendered after _mark_options_stale
+        
+        If the site reuses the same option elements (for example, two models
+        with identical years), no fresh option appears and the current ones
+        are used once the timeout runs out.
+        """
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+        try:
+            self.page.wait_for_selector(f'{selector}:not([data-cr-stale])', state='attached', timeout=timeout)
+        except PlaywrightTimeoutError:
+            pass
+    
+    def _load_checkpoint(self, checkpoint_file):
+        """Load the makes finished by an interrupted catalog crawl"""
+        if not checkpoint_file or not os.path.exists(checkpoint_file):
+            return {}
+        return self.load_vehicle_data(checkpoint_file)
+    
+    def _save_checkpoint(self, data, checkpoint_file):
+        """Atomically save the partial catalog after a make is done"""
+        if not checkpoint_file:
+            return
+        tmp_file = checkpoint_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_file, checkpoint_file)
             
     def save_vehicle_data(self, data, filename='vehicle_data.json'):
         """Save vehicle data to a JSON file
@@ -390,13 +1075,38 @@ class ConsumerReportsScraper:
             print(f"Error loading vehicle data: {e}")
             return {}
     
+    def load_catalog_index(self, filename=CATALOG_FILE):
+        """Load the Consumer Reports catalog as a lookup index
+        
+        The index is parsed once per process and reused until the file changes.
+        
+        Args:
+            filename (str): Path to the catalog file
+            
+        Returns:
+            CatalogIndex: Catalog index, or None if it could not be loaded
+        """
+        try:
+            return CatalogIndex.from_file(filename)
+        except Exception as e:
+            print(f"Error loading vehicle catalog: {e}")
+            return None
+    
     def close_session(self):
         """Close the browser session"""
+        if self.http:
+            self.http.close()
+            self.http = None
         if self.browser:
             self.browser.close()
         if self.playwright:
             self.playwright.stop()
         self.browser = None
         self.playwright = None
+        self.context = None
         self.page = None
+        self.worker_pages = []
+        self._navigations.clear()
+        self._crashed_pages.clear()
+        self._context_navigations = 0
         print("Session closed")
\ No newline at end of file
@@ -0,0 +1,134 @@
+import json
+import re
+
+# Script tags and inline assignments that carry the page state as JSON
+_JSON_SCRIPT = re.compile(
+    r'<script[^>]*type="application/(?:ld\+)?json"[^>]*>(.*?)</script>', re.DOTALL | re.IGNORECASE
+)
+_STATE_ASSIGNMENT = re.compile(
+    r'window\.(?:__INITIAL_STATE__|__PRELOADED_STATE__|__APOLLO_STATE__)\s*=\s*(\{.*?\})\s*;?\s*</script>', re.DOTALL
+)
+
+# Normalized key names for each result field, best match first
+FIELD_KEYS = {
+    'reliability_score': ('predictedreliability', 'reliabilityscore', 'reliabilityrating', 'reliability'),
+    'satisfaction_score': ('predictedownersatisfaction', 'ownersatisfaction', 'satisfactionscore', 'satisfaction'),
+    'owner_reported_mpg': ('ownerreportedmpg', 'ownermpg', 'ownerreportedfueleconomy'),
+}
+
+# Keys holding the number when a field is an object, e.g. {"score": 78}
+_VALUE_KEYS = ('score', 'value', 'rating', 'mpg')
+
+# Values outside these bounds are not scores, e.g. a year in a link under a "reliability" key
+FIELD_RANGES = {
+    'reliability_score': (0, 100),
+    'satisfaction_score': (0, 100),
+    'owner_reported_mpg': (1, 250),
+}
+
+_NUMBER = re.compile(r'\s*(\d+(?:\.\d+)?)\s*')
+
+
+def extract_embedded_json(html):
+    """Find JSON state embedded in an overview page
+
+    Args:
+        html (str): Page HTML
+
+    Returns:
+        list: Parsed JSON documents, in page order
+    """
+    documents = []
+    for match in list(_JSON_SCRIPT.finditer(html)) + list(_STATE_ASSIGNMENT.finditer(html)):
+        try:
+            documents.append(json.loads(match.group(1)))
+        except ValueError:
+            continue
+    return documents
+
+
+def _normalize_key(key):
+    return re.sub(r'[^a-z]', '', str(key).lower())
+
+
+def _scalar(value, low, high):
+    """Return a score from a JSON value, or None if it does not hold one
+
+    Only numbers and strings that are a number, between low and high, count.
+    Anything else (text, URLs, ids) is not a score, so the caller falls back
+    to reading the rendered page.
+    """
+    if isinstance(value, dict):
+        for key in _VALUE_KEYS:
+            if key in value:
+                return _scalar(value[key], low, high)
+        return None
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, str):
+        match = _NUMBER.fullmatch(value)
+        if not match:
+            return None
+        value = float(match.group(1))
+    if not isinstance(value, (int, float)) or not low <= value <= high:
+        return None
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def find_scores(payload):
+    """Pull the reliability, satisfaction and MPG values out of a JSON payload
+
+    The whole document is searched, and for each field the best-ranked key
+    in FIELD_KEYS wins.
+
+    Args:
+        payload: Parsed JSON (dict, list, or a list of documents)
+
+    Returns:
+        dict: Field name to value for every field that was found
+    """
+    best = {}
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        for key, value in node.items():
+            normalized = _normalize_key(key)
+            for field, candidates in FIELD_KEYS.items():
+                if normalized in candidates:
+                    rank = candidates.index(normalized)
+                    score = _scalar(value, *FIELD_RANGES[field])
+                    if score is not None and (field not in best or rank < best[field][0]):
+                        best[field] = (rank, score)
+            if isinstance(value, (dict, list)):
+                stack.append(value)
+    return {field: score for field, (_, score) in best.items()}
+
+
+def parse_overview_html(html, make, model, year):
+    """Build a result from the JSON embedded in an overview page
+
+    Args:
+        html (str): Page HTML
+        make (str): Vehicle make (manufacturer)
+        model (str): Vehicle model
+        year (int): Vehicle year
+
+    Returns:
+        dict: Vehicle data in the same shape as the DOM scraper, or None if no scores were found
+    """
+    scores = find_scores(extract_embedded_json(html))
+    if not scores:
+        return None
+    return {
+        'make': make,
+        'model': model,
+        'year': year,
+        'reliability_score': scores.get('reliability_score', 'N/A'),
+        'satisfaction_score': scores.get('satisfaction_score', 'N/A'),
+        'owner_reported_mpg': scores.get('owner_reported_mpg', 'N/A'),
+    }
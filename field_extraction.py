@@ -0,0 +1,103 @@
+import re
+from collections import namedtuple
+
+SCORE_SELECTOR = 'span.crux-body-copy.crux-body-copy--extra-small--bold.bar-ratings-chart__score'
+MPG_SELECTOR = 'div.fuel-efficiency-component__text-box.qa-qwner-reported-mpg b'
+# Shown in place of the ratings chart on overview pages without ratings
+NO_RATINGS_SELECTOR = '.bar-ratings-chart__no-data, .crux-not-rated'
+
+_NUMBER = re.compile(r'(\d+)')
+_PRICE = re.compile(r'\$\s*([\d,]+)')
+
+
+def text(value):
+    """Use the element text as is"""
+    return value
+
+
+def first_number(value):
+    """Extract just the number from text like "26 MPG", keeping the text if there is none"""
+    match = _NUMBER.search(value)
+    return match.group(1) if match else value
+
+
+def price_range(value):
+    """Turn text like "$25,000 - $35,000" into [25000, 35000]"""
+    prices = [int(price.replace(',', '')) for price in _PRICE.findall(value)]
+    return [min(prices), max(prices)] if prices else value
+
+
+# selector: CSS selector, index: which match to read, parser: applied to the stripped text
+Field = namedtuple('Field', ['selector', 'index', 'parser'], defaults=[0, text])
+
+# A labelled list, e.g. rating bars: one item per match of item_selector, with the
+# label and value read from inside it. Extracted as {label: parser(value)}
+Collection = namedtuple('Collection', ['item_selector', 'label_selector', 'value_selector', 'parser'],
+                        defaults=[text])
+
+# Fields read from an overview page, in output column order
+FIELD_SPEC = {
+    'reliability_score': Field(SCORE_SELECTOR, 0),   # First score is usually reliability
+    'satisfaction_score': Field(SCORE_SELECTOR, 1),  # Second score is usually satisfaction
+    'owner_reported_mpg': Field(MPG_SELECTOR, parser=first_number),
+}
+
+# Everything else on the overview page that one visit can supply
+EXTENDED_FIELD_SPEC = {
+    **FIELD_SPEC,
+    'road_test_score': Field('.road-test-score__score', parser=first_number),
+    'price_range': Field('.price-range__value', parser=price_range),
+    'rating_bars': Collection('.bar-ratings-chart__item', '.bar-ratings-chart__label', SCORE_SELECTOR),
+    'trouble_spots': Collection('.reliability-trouble-spots__item', '.reliability-trouble-spots__label',
+                                '.reliability-trouble-spots__rating', first_number),
+}
+
+# Reads the text of every field in one round-trip to the browser
+EXTRACT_JS = '''
+specs => {
+    const read = (root, selector) => {
+        const el = selector ? root.querySelector(selector) : root;
+        return el ? el.innerText : null;
+    };
+    const values = {};
+    for (const spec of specs) {
+        if (spec.item_selector) {
+            values[spec.name] = Array.from(document.querySelectorAll(spec.item_selector))
+                .map(item => [read(item, spec.label_selector), read(item, spec.value_selector)])
+                .filter(([label, value]) => label !== null && value !== null);
+        } else {
+            const el = document.querySelectorAll(spec.selector)[spec.index];
+            values[spec.name] = el ? el.innerText : null;
+        }
+    }
+    return values;
+}
+'''
+
+
+def has_values(values, missing='N/A'):
+    """Whether extract_fields found anything at all on the page"""
+    return any(value != missing and value != {} for value in values.values())
+
+
+def extract_fields(page, spec=FIELD_SPEC, missing='N/A'):
+    """Read every field of a spec from a page with a single page.evaluate call
+
+    Args:
+        page: Playwright page with the overview loaded
+        spec (dict): Field name to Field or Collection
+        missing (str): Value for fields whose element is not on the page
+
+    Returns:
+        dict: Field name to parsed value, in spec order
+    """
+    specs = [dict(field._asdict(), name=name, parser=None) for name, field in spec.items()]
+    raw = page.evaluate(EXTRACT_JS, specs)
+    values = {}
+    for name, field in spec.items():
+        value = raw.get(name)
+        if isinstance(field, Collection):
+            values[name] = {label.strip(): field.parser(item.strip()) for label, item in value or []}
+        else:
+            values[name] = missing if value is None else field.parser(value.strip())
+    return values
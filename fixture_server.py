@@ -0,0 +1,212 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+from vehicle_catalog import CATALOG_FILE, normalize_name
+
+# Stand-ins for the Consumer Reports pages, using the same selectors as the live site
+HOME_HTML = '''<!DOCTYPE html>
+<html><body>
+<h1>Consumer Reports</h1>
+<span class="cda-gnav__main-sign-in" onclick="document.getElementById('signin').style.display = 'block'">Sign In</span>
+<form id="signin" style="display: none"
+      onsubmit="document.cookie = 'cr_session=fixture; path=/; max-age=86400'; location.href = '/'; return false;">
+    <input id="gnav-signin-username">
+    <input id="gnav-signin-password" type="password">
+    <button id="gnav-signin-submit" type="submit">Sign In</button>
+</form>
+</body></html>
+'''
+
+OVERVIEW_HTML = '''<!DOCTYPE html>
+<html><head>
+<link rel="stylesheet" href="/static/site.css">
+<script id="__NEXT_DATA__" type="application/json">{payload}</script>
+</head><body>
+<h1>{year} {make} {model}</h1>
+<img src="/static/hero.jpg">
+<ul class="bar-ratings-chart">
+    <li class="bar-ratings-chart__item">
+        <span class="bar-ratings-chart__label">Predicted reliability</span>
+        <span class="crux-body-copy crux-body-copy--extra-small--bold bar-ratings-chart__score">{reliability}</span>
+    </li>
+    <li class="bar-ratings-chart__item">
+        <span class="bar-ratings-chart__label">Owner satisfaction</span>
+        <span class="crux-body-copy crux-body-copy--extra-small--bold bar-ratings-chart__score">{satisfaction}</span>
+    </li>
+</ul>
+<div class="fuel-efficiency-component__text-box qa-qwner-reported-mpg"><b>{mpg} MPG</b></div>
+<div class="road-test-score__score">{road_test}</div>
+<div class="price-range__value">${price_low:,} - ${price_high:,}</div>
+</body></html>
+'''
+
+CARS_HTML = '''<!DOCTYPE html>
+<html><body><h1>Cars</h1></body></html>
+'''
+
+_OVERVIEW_PATH = re.compile(r'^/cars/([^/]+)/([^/]+)/(\d{4})/overview/?$')
+
+
+def fixture_scores(make, model, year):
+    """Deterministic fake scores for a vehicle, stable across runs"""
+    seed = zlib.crc32(f'{normalize_name(make)}/{normalize_name(model)}/{year}'.encode('utf-8'))
+    return {
+        'reliability': 40 + seed % 60,
+        'satisfaction': 1 + seed % 5,
+        'mpg': 15 + seed % 40,
+        'road_test': 50 + seed % 50,
+        'price_low': 20000 + (seed % 40) * 1000,
+        'price_high': 30000 + (seed % 40) * 1000,
+    }
+
+
+class FixtureServer:
+    """Local HTTP server with recorded Consumer Reports and NHTSA responses
+
+    Serves the login page, overview pages for every vehicle in the catalog,
+    a bare cars page, static assets, and NHTSA vPIC JSON built from the same
+    catalog. Vehicles outside the catalog get a 404. An optional per-request
+    latency stands in for the network. Recorded pages saved as
+    ``home.html``/``overview.html`` in pages_dir replace the built-in ones
+    (the overview page is formatted with the fields of OVERVIEW_HTML).
+
+    Point the scraper at ``server.url`` with ``base_url`` and the NHTSA fetch
+    at ``server.nhtsa_url``.
+    """
+    def __init__(self, catalog=None, latency=0.0, pages_dir=None, host='127.0.0.1', port=0):
+        """
+        Args:
+            catalog (dict): Catalog {make: {model: [years]}}. Loaded from CATALOG_FILE if None
+            latency (float): Seconds to wait before answering each request
+            pages_dir (str): Directory with recorded pages overriding the built-in ones
+            host (str): Interface to listen on
+            port (int): Port to listen on. 0 picks a free port
+        """
+        if catalog is None:
+            with open(CATALOG_FILE, 'r') as f:
+                catalog = json.load(f)
+        self.catalog = catalog
+        self.latency = latency
+        self.home_html = self._load_page(pages_dir, 'home.html', HOME_HTML)
+        self.overview_html = self._load_page(pages_dir, 'overview.html', OVERVIEW_HTML)
+        self.requests = 0
+        self.not_modified = 0  # requests answered with 304 Not Modified
+
+        self._years = {}
+        self._make_ids = {}
+        for make_id, (make, models) in enumerate(catalog.items(), start=1):
+            self._make_ids[make_id] = make
+            for model, years in models.items():
+                self._years[(normalize_name(make), normalize_name(model))] = (make, model, set(years))
+
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @staticmethod
+    def _load_page(pages_dir, name, default):
+        if pages_dir and os.path.exists(os.path.join(pages_dir, name)):
+            with open(os.path.join(pages_dir, name), 'r') as f:
+                return f.read()
+        return default
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def nhtsa_url(self):
+        return f'{self.url}/api/vehicles'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def respond(self, path):
+        """Build the response for a request path
+
+        Returns:
+            tuple: (status, content type, body bytes)
+        """
+        path = urlparse(path).path
+        if path == '/':
+            return 200, 'text/html', self.home_html.encode('utf-8')
+        if path.rstrip('/') == '/cars':
+            return 200, 'text/html', CARS_HTML.encode('utf-8')
+        if path.startswith('/static/'):
+            # Stand-in for images, stylesheets and fonts
+            return 200, 'application/octet-stream', b'\0' * 50000
+
+        match = _OVERVIEW_PATH.match(path)
+        if match:
+            make_slug, model_slug, year = match.group(1), match.group(2), int(match.group(3))
+            entry = self._years.get((make_slug, model_slug))
+            if entry is None or year not in entry[2]:
+                return 404, 'text/html', b'<html><body><h1>Page not found</h1></body></html>'
+            make, model, _ = entry
+            scores = fixture_scores(make, model, year)
+            payload = json.dumps({'props': {'vehicle': {
+                'predictedReliability': {'score': scores['reliability']},
+                'ownerSatisfaction': scores['satisfaction'],
+                'ownerReportedMpg': scores['mpg'],
+            }}})
+            html = self.overview_html.format(make=make, model=model, year=year, payload=payload, **scores)
+            return 200, 'text/html', html.encode('utf-8')
+
+        if path.lower() == '/api/vehicles/getallmakes':
+            results = [{'Make_ID': make_id, 'Make_Name': make.upper()} for make_id, make in self._make_ids.items()]
+            return 200, 'application/json', json.dumps({'Count': len(results), 'Results': results}).encode('utf-8')
+        if path.lower().startswith('/api/vehicles/getmodelsformakeid/'):
+            make = self._make_ids.get(int(path.rsplit('/', 1)[1]))
+            models = self.catalog.get(make, {}) if make else {}
+            results = [{'Make_Name': make, 'Model_Name': model} for model in models]
+            return 200, 'application/json', json.dumps({'Count': len(results), 'Results': results}).encode('utf-8')
+
+        return 404, 'text/plain', b'Not found'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                status, content_type, body = server.respond(self.path)
+                etag = None
+                if status == 200 and content_type == 'application/json':
+                    # Like the NHTSA API, so cached responses can be revalidated
+                    etag = '"%s"' % hashlib.sha1(body).hexdigest()
+                    if self.headers.get('If-None-Match') == etag:
+                        server.not_modified += 1
+                        status, body = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                if etag:
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,45 +1,326 @@
-import pandas as pd
-from dotenv import load_dotenv
-from consumer_reports_scraper import ConsumerReportsScraper
-from NHTSA_Vehicles_API import load_vehicle_data
+import argparse
+import json
+import os
+import sys
+from vehicle_catalog import parse_years
 
-# Load environment variables
-load_dotenv("ConsumerReportsLogins.env")
+# Playwright, requests and pyarrow are imported by the commands that use them,
+# so `plan` and --help start without loading a browser driver.
 
-def main():
+# Images, fonts, ads and analytics are not needed to read the scores.
+# The login is saved to cr_session.json and reused until it expires.
+SCRAPER_OPTIONS = {'block_resources': True, 'wait_for': 'selectors'}
 
+DEFAULT_MAKES = ["Toyota", "Honda", "Mazda", "Hyundai", "Subaru", "Chevrolet"]
+CACHE_FILE = 'results_cache.db'
+
+# Rough seconds per page visit with SCRAPER_OPTIONS, for the time estimate of plan and --dry-run
+PAGE_SECONDS = 6.0
+
+OUTPUT_FILES = {
+    'csv': 'reliability_scores.csv',
+    'jsonl': 'reliability_scores.jsonl',
+    'parquet': 'reliability_scores.parquet',
+    'dataset': 'reliability_scores',
+}
+
+COMMANDS = ('plan', 'scrape', 'catalog', 'export', 'bench')
+
+
+def _add_selection_args(parser):
+    parser.add_argument('--makes', nargs='+', default=DEFAULT_MAKES, help="Makes to include, or 'all'")
+    parser.add_argument('--years', type=parse_years, help="e.g. 2024-2025 or 2016,2020-2022. Defaults to 2010-2025")
+    parser.add_argument('--source', choices=['nhtsa', 'catalog'], default='nhtsa',
+                        help="Take models from the NHTSA list, mapped to catalog names, or straight from the catalog")
+    parser.add_argument('--retry-failed', action='store_true', help="Only the vehicles in dead_letters.jsonl")
+
+
+def _add_concurrency_args(parser):
+    parser.add_argument('--processes', type=int, default=1, help="Scrape in this many processes, each with its own browser")
+    parser.add_argument('--workers', type=int, default=1, help="Pages loading vehicles concurrently in each process")
+    parser.add_argument('--requests-per-second', type=float, default=1.0, help="Maximum page visits started per second")
+    parser.add_argument('--page-seconds', type=float, default=PAGE_SECONDS,
+                        help="Seconds per page visit assumed by the time estimate")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Scrape Consumer Reports reliability scores",
+        epilog="Without a command, the options are passed to scrape.")
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+
+    plan = subparsers.add_parser('plan', help="List the vehicles a scrape would visit and estimate the time")
+    _add_selection_args(plan)
+    _add_concurrency_args(plan)
+    plan.add_argument('--output', help="Write the work list to this JSON Lines file instead of printing it")
+
+    scrape = subparsers.add_parser('scrape', help="Scrape reliability scores")
+    _add_selection_args(scrape)
+    _add_concurrency_args(scrape)
+    scrape.add_argument('--output', help="Results file (.csv, .jsonl, .parquet, or a directory for a dataset)")
+    scrape.add_argument('--format', choices=sorted(OUTPUT_FILES),
+                        help="Output format. Defaults to the --output extension, or csv without --output")
+    scrape.add_argument('--headless', action='store_true',
+                        help="Run the browser without a window. Always on with --processes above 1 or --shard")
+    scrape.add_argument('--shard', help="Only scrape shard i of N, e.g. 2/4. Writes <output>.shard-i-of-N")
+    scrape.add_argument('--merge', type=int, metavar='N', help="Merge the outputs of N shards into --output and exit")
+    resume = scrape.add_mutually_exclusive_group()
+    resume.add_argument('--resume', dest='resume', action='store_true',
+                        help="Append to an existing output and skip the vehicles already in it")
+    resume.add_argument('--fresh', dest='resume', action='store_false',
+                        help="Overwrite the output (default). Cached results are still reused")
+    scrape.add_argument('--refresh', action='store_true',
+                        help="Re-scrape only vehicles due for a check (recent or recently changed first) and report changed scores")
+    scrape.add_argument('--refresh-limit', type=int, help="Visit at most this many vehicles in --refresh mode")
+    scrape.add_argument('--metrics', help="Export stage timings and counters to this file (.prom for Prometheus text, else JSON)")
+    scrape.add_argument('--dry-run', action='store_true', help="Show the work list and estimated time, then exit")
+
+    catalog = subparsers.add_parser('catalog', help="Update the Consumer Reports catalog from the site")
+    catalog.add_argument('--full', action='store_true', help="Crawl every make, not only makes whose model list changed")
+
+    export = subparsers.add_parser('export', help="Convert results to another format")
+    export.add_argument('source', help="Results file, dataset directory, or the result cache (.db)")
+    export.add_argument('destination', help="File or dataset directory to write")
+    export.add_argument('--format', choices=sorted(OUTPUT_FILES), help="Defaults to the destination's extension")
+
+    subparsers.add_parser('bench', add_help=False, help="Run benchmark.py, e.g. bench planning")
+    return parser
+
+
+def select_vehicles(args):
+    """The vehicles chosen by --makes, --years, --source and --retry-failed, in catalog spelling
+
+    The dead-letter file is only read here. Replayed vehicles are removed from it
+    by scrape_command once the run is over, see clear_replayed.
+
+    Returns:
+        iterable: Dicts with keys 'make', 'model', 'year', generated lazily
     """
-    #### Load vehicle data and get it already formatted for scraping ####
-    Example usage:
+    if args.retry_failed:
+        from scheduler import DeadLetterQueue
+        # Vehicles that ran out of retries on an earlier run
+        return DeadLetterQueue().peek()
+
+    makes = None if [make.lower() for make in args.makes] == ['all'] else args.makes
+    if args.source == 'catalog':
+        from vehicle_catalog import CatalogIndex
+        return CatalogIndex.from_file().vehicles(makes, args.years)
+    return _resolved_nhtsa_vehicles(makes, args.years)
+
+
+def _resolved_nhtsa_vehicles(makes, years):
+    from NHTSA_Vehicles_API import iter_vehicle_data
+    from name_resolver import NameResolver
+    from vehicle_catalog import plan_vehicles
+    # NHTSA names are mapped to Consumer Reports names (cached in name_mapping.json),
+    # and only vehicles that Consumer Reports has pages for are passed on to the scraper
+    resolver = NameResolver.from_file()
+    try:
+        yield from plan_vehicles(iter_vehicle_data(years=years, makes=makes), resolver=resolver)
+    finally:
+        resolver.save()
+
 
-    vehicles_to_scrape = load_vehicle_data(years=[2020, 2021, 2022], makes=["toyota", "honda"])
+def cache_states(vehicles):
+    """Tag each vehicle with what the result cache already has for it
+
+    Yields:
+        tuple: (vehicle, state), state being 'cached', 'empty' (known to have no ratings) or 'to_visit'
     """
+    if not os.path.exists(CACHE_FILE):
+        for vehicle in vehicles:
+            yield vehicle, 'to_visit'
+        return
 
-    makes_list = ["Toyota", "Honda", "Mazda", "Elantra", "Subaru", "Chevrolet"]
-    vehicles_to_scrape = load_vehicle_data(makes=makes_list)
+    from result_cache import ResultCache
+    cache = ResultCache(CACHE_FILE)
+    try:
+        for vehicle in vehicles:
+            if cache.get(vehicle['make'], vehicle['model'], vehicle['year']):
+                yield vehicle, 'cached'
+            elif cache.get_empty(vehicle['make'], vehicle['model'], vehicle['year']):
+                yield vehicle, 'empty'
+            else:
+                yield vehicle, 'to_visit'
+    finally:
+        cache.close()
 
-    # Initialize the scraper
-    scraper = ConsumerReportsScraper()
 
-    # uncomment this if you need to get available vehicles from Consumer Reports
-    #vehicle_data = scraper.scrape_available_vehicles()
-    #scraper.save_vehicle_data(vehicle_data)
+def plan_command(args, list_file=None):
+    """Print the work list and how long it would take to scrape, without starting a browser
+
+    The work list is streamed, so memory stays flat however many vehicles it has.
+    """
+    from metrics import format_seconds
+
+    counts = dict.fromkeys(('cached', 'empty', 'to_visit'), 0)
+    out = open(list_file, 'w') if list_file else None
+    try:
+        for vehicle, state in cache_states(select_vehicles(args)):
+            counts[state] += 1
+            if state != 'to_visit':
+                continue
+            if out:
+                out.write(json.dumps(vehicle) + '\n')
+            else:
+                print(f"{vehicle['make']} {vehicle['model']} {vehicle['year']}")
+    finally:
+        if out:
+            out.close()
+    if list_file:
+        print(f"Work list written to {list_file}")
+
+    # Limited by the rate limit or by how many pages are loading at once, whichever is lower
+    pages_per_second = min(args.requests_per_second, args.processes * args.workers / args.page_seconds)
+    print(f"\n{sum(counts.values())} vehicles planned: {counts['cached']} cached, "
+          f"{counts['empty']} known to have no ratings, {counts['to_visit']} to visit")
+    print(f"Estimated time: {format_seconds(counts['to_visit'] / pages_per_second)} with {args.processes} process(es) x "
+          f"{args.workers} worker(s), at most {args.requests_per_second} pages/s and {args.page_seconds}s per page")
+
+
+def scrape_command(args):
+    from sharding import merge_shards, parse_shard, run_shard, run_sharded, select_shard, shard_output_path
+
+    from output_writers import detect_format
+
+    output_file = args.output or OUTPUT_FILES[args.format or 'csv']
+    try:
+        output_format = detect_format(output_file, args.format)
+    except ValueError as e:
+        sys.exit(f"{e}. Use --format to choose one")
+    if args.merge:
+        count = merge_shards(output_file, args.merge, output_format, resume=args.resume)
+        print(f"\n{count} results merged into {output_file}")
+        return
+    if args.dry_run:
+        plan_command(args)
+        return
+    if args.refresh and args.resume:
+        sys.exit("--resume does not apply to --refresh, which writes only the refreshed vehicles to --output")
+
+    from dotenv import load_dotenv
+    load_dotenv("ConsumerReportsLogins.env")
+    replay_mark = None
+    if args.retry_failed:
+        from scheduler import DeadLetterQueue
+        replay_mark = DeadLetterQueue().mark()
+    vehicles_to_scrape = select_vehicles(args)
+    # Several browsers, or shards on servers without a display, never open windows
+    headless = args.headless or args.processes > 1 or bool(args.shard)
+    run_options = {'scraper_options': dict(SCRAPER_OPTIONS, headless=headless), 'workers': args.workers,
+                   'requests_per_second': args.requests_per_second}
+    write_options = dict(run_options, output_format=output_format, resume=args.resume)
 
     try:
-        # Scrape all vehicles
-        results_df = scraper.scrape_multiple_vehicles(vehicles_to_scrape)
-        
-        # Save to CSV
-        output_file = 'reliability_scores.csv'
-        results_df.to_csv(output_file, index=False)
-        print(f"\nResults saved to {output_file}")
-        
+        if args.refresh:
+            from refresh_planner import run_refresh
+            # Only the refreshed vehicles are written, so the usual output file is left alone without --output
+            run_refresh(vehicles_to_scrape, limit=args.refresh_limit, output_file=args.output,
+                        output_format=output_format if args.output else None, **run_options)
+            if replay_mark is not None:
+                clear_replayed(replay_mark)
+            return
+        # Results are cached in results_cache.db as they are scraped, so a re-run only
+        # visits missing or stale vehicles, and each result is written to the output as it arrives
+        if args.shard:
+            shard, num_shards = parse_shard(args.shard)
+            output_file = shard_output_path(output_file, shard, num_shards)
+            vehicles_to_scrape = select_shard(vehicles_to_scrape, shard, num_shards)
+            # Planning is cheap, so the work list is counted in a first pass for the ETA and then streamed
+            total = sum(1 for _ in select_shard(select_vehicles(args), shard, num_shards))
+            metrics_file = shard_output_path(args.metrics, shard, num_shards) if args.metrics else None
+            count = run_shard(vehicles_to_scrape, output_file, metrics_file=metrics_file, total=total,
+                              **write_options)
+        elif args.processes > 1:
+            count = run_sharded(vehicles_to_scrape, output_file, args.processes, metrics_file=args.metrics,
+                                **write_options)
+        else:
+            total = sum(1 for _ in select_vehicles(args))
+            count = run_shard(vehicles_to_scrape, output_file, metrics_file=args.metrics, total=total,
+                              **write_options)
+        print(f"\n{count} results saved to {output_file}")
+        if replay_mark is not None:
+            clear_replayed(replay_mark)
+
     except Exception as e:
         print(f"Error during scraping: {e}")
-    
+
+
+def clear_replayed(mark):
+    """Drop the dead letters that a --retry-failed run scraped, found empty or dead-lettered again
+
+    Vehicles the run never got to, e.g. because the login failed, stay in the file.
+    """
+    from result_cache import ResultCache
+    from scheduler import DeadLetterQueue
+
+    cache = ResultCache(CACHE_FILE)
+    try:
+        left = DeadLetterQueue().remove_replayed(
+            lambda make, model, year: bool(cache.get(make, model, year) or cache.get_empty(make, model, year)), mark)
+    finally:
+        cache.close()
+    print(f"{left} entries left in dead_letters.jsonl")
+
+
+def catalog_command(args):
+    """Crawl the catalog and replace Consumer_Reports_Vehicle_List.json, only if the crawl completed"""
+    from dotenv import load_dotenv
+    from consumer_reports_scraper import ConsumerReportsScraper
+    from vehicle_catalog import CATALOG_FILE
+
+    load_dotenv("ConsumerReportsLogins.env")
+    scraper = ConsumerReportsScraper()
+    try:
+        vehicle_data = scraper.scrape_available_vehicles(incremental=not args.full, existing_file=CATALOG_FILE)
+    except Exception:
+        sys.exit(f"Catalog crawl stopped, {CATALOG_FILE} left unchanged. Run it again to resume")
     finally:
-        # Always close the session when done
         scraper.close_session()
+    if not vehicle_data:
+        sys.exit(f"Catalog crawl did not start, {CATALOG_FILE} left unchanged")
+    scraper.save_vehicle_data(vehicle_data, CATALOG_FILE)
+
+
+def export_command(args):
+    from output_writers import open_writer, read_results
+
+    cache = None
+    if args.source.endswith('.db'):
+        from result_cache import ResultCache
+        cache = ResultCache(args.source, ttl=None)
+        rows = cache.iter_results()
+    else:
+        rows = read_results(args.source)
+    try:
+        with open_writer(args.destination, output_format=args.format) as writer:
+            for row in rows:
+                writer.write(row)
+    finally:
+        if cache:
+            cache.close()
+    print(f"{writer.rows_written} results written to {args.destination}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ['bench']:
+        import benchmark
+        return benchmark.main(argv[1:])
+    if not argv or argv[0] not in COMMANDS + ('-h', '--help'):
+        # Options without a command, as before there were commands
+        argv = ['scrape'] + argv
+
+    args = build_parser().parse_args(argv)
+    if args.command == 'plan':
+        plan_command(args, list_file=args.output)
+    elif args.command == 'scrape':
+        scrape_command(args)
+    elif args.command == 'catalog':
+        catalog_command(args)
+    elif args.command == 'export':
+        export_command(args)
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, of the histogram buckets for every stage
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Stages timed by the scraper, in the order a vehicle goes through them
+STAGES = ('start_session', 'rate_limit_wait', 'retry_wait', 'http_fetch', 'navigate', 'load_wait', 'extract', 'write',
+          'recycle_page', 'recycle_context')
+
+# Counters kept by the scraper
+COUNTERS = ('scraped', 'cached', 'empty', 'skipped', 'retried', 'failed')
+
+
+class Histogram:
+    """Cumulative-bucket histogram of durations, as used by Prometheus"""
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'max': round(self.max, 6),
+            'buckets': {str(bound): count for bound, count in zip(self.buckets, self.counts)},
+        }
+
+
+class ScrapeMetrics:
+    """Per-stage timings, counters and progress reporting for a scraping run
+
+    The scraper times each stage of a vehicle (see STAGES) and counts
+    outcomes (see COUNTERS). While vehicles are being scraped, a progress line
+    with the rate and ETA is printed every ``progress_interval`` seconds, and
+    the metrics are written to ``export_file`` at the same time so long runs
+    can be watched from outside, e.g. by the Prometheus node exporter's
+    textfile collector.
+    """
+    def __init__(self, export_file=None, progress_interval=30.0, buckets=DEFAULT_BUCKETS):
+        """
+        Args:
+            export_file (str): File the metrics are written to. Prometheus text format if it ends
+                in .prom or .txt, JSON otherwise. None keeps them in memory only
+            progress_interval (float): Seconds between progress lines. None disables them
+            buckets (tuple): Histogram bucket upper bounds in seconds
+        """
+        self.export_file = export_file
+        self.progress_interval = progress_interval
+        self.stages = {stage: Histogram(buckets) for stage in STAGES}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.total = None
+        self.started = time.monotonic()
+        self._buckets = buckets
+        self._last_progress = self.started
+
+    @contextmanager
+    def time(self, stage):
+        """Time the body of a with block as one observation of a stage"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage, seconds):
+        if stage not in self.stages:
+            self.stages[stage] = Histogram(self._buckets)
+        self.stages[stage].observe(seconds)
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+        self.tick()
+
+    def start_run(self, total=None):
+        """Reset the clock for the progress line
+
+        Args:
+            total (int): Number of vehicles in the run, if known, for the ETA
+        """
+        self.total = total
+        self.started = self._last_progress = time.monotonic()
+
+    @property
+    def done(self):
+        """Vehicles finished one way or another"""
+        return sum(self.counters.get(counter, 0) for counter in ('scraped', 'cached', 'empty', 'skipped', 'failed'))
+
+    def progress_line(self):
+        elapsed = time.monotonic() - self.started
+        done = self.done
+        rate = done / elapsed if elapsed else 0.0
+        line = f"Progress: {done}"
+        if self.total:
+            line += f"/{self.total} vehicles ({done / self.total:.0%})"
+            if rate:
+                line += f", ETA {format_seconds(max(0, self.total - done) / rate)}"
+        else:
+            line += " vehicles"
+        counts = ', '.join(f"{self.counters.get(counter, 0)} {counter}" for counter in COUNTERS)
+        return f"{line}, {rate:.2f}/s, {counts}"
+
+    def tick(self):
+        """Print progress and export the metrics if progress_interval has passed"""
+        if self.progress_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_progress < self.progress_interval:
+            return
+        self._last_progress = now
+        print(self.progress_line())
+        if self.export_file:
+            self.write()
+
+    def to_dict(self):
+        return {
+            'elapsed_seconds': round(time.monotonic() - self.started, 3),
+            'total': self.total,
+            'counters': dict(self.counters),
+            'stages': {stage: histogram.to_dict() for stage, histogram in self.stages.items()},
+        }
+
+    def to_prometheus(self, prefix='cr_scraper'):
+        """Render the metrics in the Prometheus text exposition format"""
+        lines = [
+            f'# HELP {prefix}_vehicles_total Vehicles by outcome',
+            f'# TYPE {prefix}_vehicles_total counter',
+        ]
+        for counter, value in self.counters.items():
+            lines.append(f'{prefix}_vehicles_total{{outcome="{counter}"}} {value}')
+        lines += [
+            f'# HELP {prefix}_stage_seconds Time spent per scraping stage',
+            f'# TYPE {prefix}_stage_seconds histogram',
+        ]
+        for stage, histogram in self.stages.items():
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, filename=None):
+        """Write the metrics to a file, replacing it atomically
+
+        Args:
+            filename (str): Defaults to export_file. Prometheus text format for .prom and .txt, JSON otherwise
+        """
+        filename = filename or self.export_file
+        if filename.endswith(('.prom', '.txt')):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), indent=2)
+        tmp_file = f'{filename}.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(content)
+        os.replace(tmp_file, filename)
+
+    def summary(self):
+        """Human-readable table of where the time went"""
+        lines = [self.progress_line(), f"{'stage':<18}{'count':>8}{'total s':>10}{'mean s':>10}{'max s':>10}"]
+        for stage, histogram in self.stages.items():
+            if histogram.count:
+                lines.append(f"{stage:<18}{histogram.count:>8}{histogram.sum:>10.1f}"
+                             f"{histogram.sum / histogram.count:>10.3f}{histogram.max:>10.3f}")
+        return '\n'.join(lines)
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m" if hours else f"{minutes}m{seconds:02d}s"
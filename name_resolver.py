@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import re
+from vehicle_catalog import CATALOG_FILE, CatalogIndex, normalize_name
+
+MAPPING_FILE = 'name_mapping.json'
+
+# Bump when the matching rules change, so mappings saved by the old rules are not reused
+RESOLVER_VERSION = 1
+
+# Other spellings of Consumer Reports make names
+MAKE_ALIASES = {
+    'chevy': 'Chevrolet',
+    'vw': 'Volkswagen',
+    'mercedes': 'Mercedes-Benz',
+    'mercedes-benz': 'Mercedes-Benz',
+    'mb': 'Mercedes-Benz',
+    'alfa': 'Alfa Romeo',
+    'landrover': 'Land Rover',
+    'range-rover': 'Land Rover',
+    'mini-cooper': 'Mini',
+    'ram-trucks': 'Ram',
+}
+
+# Other spellings of model names, keyed by (make slug, compact model name)
+MODEL_ALIASES = {
+    ('toyota', 'gr86'): '86',
+    ('toyota', 'rav4prime'): 'RAV4 Prime',
+    ('chevrolet', 'silverado'): 'Silverado 1500',
+    ('gmc', 'sierra'): 'Sierra 1500',
+    ('hyundai', 'ioniq5n'): 'IONIQ 5 N',
+    ('ford', 'f150'): 'F-150',
+}
+
+# Trim-level model numbers that Consumer Reports groups into one model, e.g. BMW 328i -> 3 Series
+MODEL_PATTERNS = {
+    'bmw': [(re.compile(r'^([1-8])\d{2}[a-z]*$'), '{0} Series')],
+    'mercedes-benz': [(re.compile(r'^([a-z])\d{3}[a-z]*$'), '{0}-Class')],
+}
+
+# Words that make a different Consumer Reports model when present, so they are never dropped in a match
+VARIANT_TOKENS = {'hybrid', 'electric', 'ev', 'plug', 'in', 'phev', 'prime', 'sport', 'coupe', 'hatchback', 'suv'}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+
+
+def _rules_hash():
+    """Hash of the alias tables, so editing one invalidates the saved mapping"""
+    rules = [
+        sorted(MAKE_ALIASES.items()),
+        sorted(MODEL_ALIASES.items()),
+        sorted((make, [(pattern.pattern, name) for pattern, name in patterns]) for make, patterns in MODEL_PATTERNS.items()),
+        sorted(VARIANT_TOKENS),
+    ]
+    return hashlib.sha1(json.dumps(rules).encode('utf-8')).hexdigest()[:12]
+
+
+def compact_name(name):
+    """Letters and digits only, so "CR-V", "CRV" and "Cr V" all become "crv" """
+    return _NON_ALNUM.sub('', str(name).lower())
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance between two strings
+
+    Args:
+        limit (int): Stop early and return limit + 1 once the distance is known to exceed it
+
+    Returns:
+        int: Number of single-character insertions, deletions and substitutions
+    """
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class _MakeModels:
+    """Precomputed lookups over the models of one make"""
+    def __init__(self, models):
+        self.by_slug = {}
+        self.by_compact = {}
+        self.tokens = {}
+        self.by_token = {}
+        for model in models:
+            self.by_slug[normalize_name(model)] = model
+            self.by_compact.setdefault(compact_name(model), []).append(model)
+            tokens = frozenset(normalize_name(model).split('-'))
+            self.tokens[model] = tokens
+            for token in tokens:
+                self.by_token.setdefault(token, []).append(model)
+
+
+class NameResolver:
+    """Maps NHTSA make and model names to Consumer Reports catalog names
+
+    Names are tried, in order, as an exact slug, a known alias, a spelling
+    that differs only in punctuation, a trim-level pattern (e.g. BMW 328i),
+    a token match (e.g. Lexus "RX 350" -> "RX") and finally a close spelling
+    by edit distance. A name is only mapped when the match is unambiguous.
+    Everything else maps to None, so no page load is spent on a name
+    Consumer Reports does not have.
+
+    Resolved names are memoized and can be saved to a mapping file, which is
+    reused for as long as the catalog file is unchanged.
+    """
+    def __init__(self, catalog, mapping=None):
+        """
+        Args:
+            catalog (dict): Models of every make, {make: [models]} as from CatalogIndex.models,
+                or the catalog itself, {make: {model: [years]}}
+            mapping (dict): Previously resolved names, as returned by to_mapping
+        """
+        self._makes = {normalize_name(make): make for make in catalog}
+        self._compact_makes = {compact_name(make): make for make in catalog}
+        self._models = {normalize_name(make): _MakeModels(models) for make, models in catalog.items()}
+        mapping = mapping or {}
+        self._make_cache = dict(mapping.get('makes', {}))
+        self._model_cache = {tuple(key.split('|', 1)): value for key, value in mapping.get('models', {}).items()}
+        self._signature = None
+        self._mapping_file = None
+        self._dirty = False
+
+    @classmethod
+    def from_file(cls, catalog_file=CATALOG_FILE, mapping_file=MAPPING_FILE):
+        """Build a resolver from the catalog, reusing the saved mapping if neither the catalog nor the rules changed
+
+        Args:
+            catalog_file (str): Path to the Consumer Reports catalog file
+            mapping_file (str): File resolved names are saved to and loaded from. None disables it
+
+        Returns:
+            NameResolver: Resolver over the catalog
+        """
+        catalog = CatalogIndex.from_file(catalog_file).models()
+        stat = os.stat(catalog_file)
+        signature = [stat.st_size, stat.st_mtime, RESOLVER_VERSION, _rules_hash()]
+
+        mapping = None
+        if mapping_file and os.path.exists(mapping_file):
+            try:
+                with open(mapping_file, 'r') as f:
+                    saved = json.load(f)
+                if saved.get('catalog') == signature:
+                    mapping = saved
+            except (OSError, ValueError):
+                pass
+
+        resolver = cls(catalog, mapping)
+        resolver._signature = signature
+        resolver._mapping_file = mapping_file
+        return resolver
+
+    def to_mapping(self):
+        return {
+            'catalog': self._signature,
+            'makes': self._make_cache,
+            'models': {'|'.join(key): value for key, value in self._model_cache.items()},
+        }
+
+    def save(self, mapping_file=None):
+        """Write the resolved names to the mapping file if anything new was resolved"""
+        mapping_file = mapping_file or self._mapping_file
+        if not mapping_file or not self._dirty:
+            return
+        tmp_file = f'{mapping_file}.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.to_mapping(), f, indent=1)
+        os.replace(tmp_file, mapping_file)
+        self._dirty = False
+
+    def resolve_make(self, make):
+        """
+        Returns:
+            str: Make as spelled in the catalog, or None if there is no match
+        """
+        key = normalize_name(make)
+        if key not in self._make_cache:
+            self._make_cache[key] = self._match_make(key)
+            self._dirty = True
+        return self._make_cache[key]
+
+    def resolve(self, make, model):
+        """Map a make and model to their catalog spelling
+
+        Returns:
+            tuple: (make, model) as spelled in the catalog, or None if there is no match
+        """
+        cr_make = self.resolve_make(make)
+        if cr_make is None:
+            return None
+        key = (normalize_name(cr_make), normalize_name(model))
+        if key not in self._model_cache:
+            self._model_cache[key] = self._match_model(key[0], key[1])
+            self._dirty = True
+        cr_model = self._model_cache[key]
+        return (cr_make, cr_model) if cr_model is not None else None
+
+    def resolve_many(self, pairs):
+        """Resolve many (make, model) pairs, each distinct pair once
+
+        Returns:
+            dict: (make, model) as given -> (make, model) in the catalog, or None
+        """
+        return {pair: self.resolve(*pair) for pair in dict.fromkeys(pairs)}
+
+    def _match_make(self, key):
+        if key in self._makes:
+            return self._makes[key]
+        if key in MAKE_ALIASES:
+            return MAKE_ALIASES[key]
+        compact = compact_name(key)
+        if compact in self._compact_makes:
+            return self._compact_makes[compact]
+        if len(compact) >= 5:
+            close = [make for other, make in self._compact_makes.items() if edit_distance(compact, other, 1) <= 1]
+            if len(close) == 1:
+                return close[0]
+        return None
+
+    def _match_model(self, make_key, key):
+        models = self._models.get(make_key)
+        if models is None:
+            return None
+        if key in models.by_slug:
+            return models.by_slug[key]
+
+        compact = compact_name(key)
+        alias = MODEL_ALIASES.get((make_key, compact))
+        if alias is not None and normalize_name(alias) in models.by_slug:
+            return models.by_slug[normalize_name(alias)]
+        if len(models.by_compact.get(compact, [])) == 1:
+            return models.by_compact[compact][0]
+
+        for pattern, template in MODEL_PATTERNS.get(make_key, []):
+            match = pattern.match(compact)
+            if match:
+                slug = normalize_name(template.format(*(group.upper() for group in match.groups())))
+                if slug in models.by_slug:
+                    return models.by_slug[slug]
+
+        tokens = frozenset(key.split('-'))
+        candidates = {model for token in tokens for model in models.by_token.get(token, [])}
+
+        # Catalog name inside the query, e.g. "RX 350" -> "RX". The longest such name wins
+        inside = [model for model in candidates
+                  if models.tokens[model] < tokens and not (tokens - models.tokens[model]) & VARIANT_TOKENS]
+        best = _unique_best(inside, lambda model: len(models.tokens[model]))
+        if best is not None:
+            return best
+
+        # Query inside a catalog name, e.g. "CT" -> "CT 200h". The shortest such name wins
+        containing = [model for model in candidates
+                      if tokens < models.tokens[model] and not (models.tokens[model] - tokens) & VARIANT_TOKENS]
+        best = _unique_best(containing, lambda model: -len(models.tokens[model]))
+        if best is not None:
+            return best
+
+        # Misspellings, only for names without digits where one wrong letter is not a different model
+        if len(compact) >= 5 and compact.isalpha():
+            limit = 1 if len(compact) < 8 else 2
+            distances = {model: edit_distance(compact, other, limit)
+                         for other, names in models.by_compact.items() if other.isalpha()
+                         for model in names}
+            close = [model for model, distance in distances.items() if distance <= limit]
+            best = _unique_best(close, lambda model: -distances[model])
+            if best is not None:
+                return best
+        return None
+
+
+def _unique_best(candidates, score):
+    """The candidate with the highest score, or None if there is none or a tie"""
+    if not candidates:
+        return None
+    ranked = sorted(candidates, key=score, reverse=True)
+    if len(ranked) > 1 and score(ranked[0]) == score(ranked[1]):
+        return None
+    return ranked[0]
@@ -0,0 +1,392 @@
+import csv
+import json
+import os
+import shutil
+import uuid
+from records import VehicleRecord, VehicleScore
+from vehicle_catalog import normalize_name
+
+
+def result_key(result):
+    """Key identifying a vehicle in an output file"""
+    return normalize_name(result['make']), normalize_name(result['model']), int(result['year'])
+
+
+class ResultWriter:
+    """Base class for streaming result writers
+
+    Results are appended one at a time as they are scraped and flushed to
+    disk every ``fsync_every`` rows, so a crash loses at most that many rows.
+    With ``resume=True`` an existing output file is kept and appended to, and
+    ``completed_keys`` tells the caller which vehicles it already contains.
+    """
+    def __init__(self, filename, resume=False, fsync_every=50):
+        """
+        Args:
+            filename (str): Path to the output file
+            resume (bool): Append to an existing file instead of overwriting it
+            fsync_every (int): Number of rows written between flushes to disk
+        """
+        self.filename = filename
+        self.resume = resume and os.path.exists(filename)
+        self.fsync_every = fsync_every
+        self.completed_keys = set()
+        self.rows_written = 0
+        self._unsynced = 0
+
+    def write(self, result):
+        """Append one result to the output
+
+        Args:
+            result (dict): Scraped vehicle data
+        """
+        self._write(result)
+        self.completed_keys.add(result_key(result))
+        self.rows_written += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.flush()
+
+    def flush(self):
+        """Flush buffered rows to disk"""
+        self._unsynced = 0
+
+    def close(self):
+        """Flush remaining rows and close the output file"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _write(self, result):
+        raise NotImplementedError
+
+
+class _FileWriter(ResultWriter):
+    """Shared resume, flush and close handling for text formats"""
+    def _drop_torn_line(self):
+        """Cut a resumed file back to its last complete line
+
+        A crash can leave the last row half written. It is dropped, and the
+        vehicle is scraped again (or read from the result cache).
+        """
+        with open(self.filename, 'rb+') as f:
+            content = f.read()
+            end = content.rfind(b'\n') + 1
+            if end < len(content):
+                print(f"Dropping an incomplete last line from {self.filename}")
+                f.truncate(end)
+        if not end:
+            # Nothing complete left, not even a CSV header
+            self.resume = False
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        super().flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class CsvWriter(_FileWriter):
+    """Write results as CSV rows
+
+    The columns are taken from the existing header when resuming, otherwise
+    from fieldnames or the keys of the first result.
+    """
+    def __init__(self, filename, resume=False, fsync_every=50, fieldnames=None):
+        super().__init__(filename, resume, fsync_every)
+        self.writer = None
+        if self.resume:
+            self._drop_torn_line()
+        if self.resume:
+            with open(filename, 'r', newline='') as f:
+                reader = csv.DictReader(f)
+                fieldnames = reader.fieldnames or fieldnames
+                self.completed_keys.update(result_key(row) for row in reader)
+        self.file = open(filename, 'a' if self.resume else 'w', newline='')
+        if fieldnames:
+            self._open_writer(fieldnames, write_header=not self.resume)
+
+    def _open_writer(self, fieldnames, write_header):
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames, extrasaction='ignore')
+        if write_header:
+            self.writer.writeheader()
+
+    def _write(self, result):
+        if self.writer is None:
+            self._open_writer(list(result), write_header=True)
+        self.writer.writerow(result)
+
+
+class JsonLinesWriter(_FileWriter):
+    """Write results as one JSON object per line"""
+    def __init__(self, filename, resume=False, fsync_every=50):
+        super().__init__(filename, resume, fsync_every)
+        if self.resume:
+            self._drop_torn_line()
+        if self.resume:
+            with open(filename, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        self.completed_keys.add(result_key(json.loads(line)))
+        self.file = open(filename, 'a' if self.resume else 'w')
+
+    def _write(self, result):
+        self.file.write(json.dumps(result) + '\n')
+
+
+class ParquetWriter(ResultWriter):
+    """Write results to a Parquet file, one row group per ``fsync_every`` rows
+
+    Requires pyarrow. A Parquet file is only readable once its footer is
+    written on close, so rows go to ``<filename>.tmp``, which replaces the
+    output on close. Parquet files cannot be appended to, so resuming reads
+    the existing rows back and rewrites them as the first row group.
+
+    The output is therefore not resumable after a crash: the previous file
+    is left intact, but the rows of the interrupted run are lost from it.
+    They are still in the result cache, so re-running brings them back
+    without page visits. Use .jsonl or .csv, or the partitioned dataset,
+    for output that survives a crash.
+    """
+    def __init__(self, filename, resume=False, fsync_every=500):
+        super().__init__(filename, resume, fsync_every)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self._rows = []
+        self._writer = None
+        self._tmp_file = f'{filename}.tmp'
+        if self.resume:
+            existing = pq.read_table(filename)
+            self.completed_keys.update(result_key(row) for row in existing.to_pylist())
+            self._open(existing.schema)
+            self._writer.write_table(existing)
+
+    def _open(self, schema):
+        self._writer = self._pq.ParquetWriter(self._tmp_file, schema)
+
+    def _write(self, result):
+        self._rows.append(result)
+
+    def flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows)
+            if self._writer is None:
+                self._open(table.schema)
+            self._writer.write_table(table.cast(self._writer.schema))
+            self._rows = []
+        super().flush()
+
+    def close(self):
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmp_file, self.filename)
+
+
+class ParquetDatasetWriter(ResultWriter):
+    """Write typed results to a Parquet dataset partitioned by make and year
+
+    Rows are converted to records.VehicleScore, so scores are stored as
+    nullable integers instead of strings. Rows from the scraper's extended
+    mode (they have a schema_version column) are converted to
+    records.VehicleRecord instead, with its nested fields as JSON text. The
+    first row decides which, and a dataset holds one kind only. Each flush
+    adds one file per partition under ``<root>/make=<make>/year=<year>/``,
+    and readers can skip whole makes and years without opening their files.
+    Requires pyarrow. Without resume, an existing dataset directory is replaced.
+    """
+    def __init__(self, filename, resume=False, fsync_every=1000, partition_cols=('make', 'year')):
+        super().__init__(filename, resume, fsync_every)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        self.partition_cols = list(partition_cols)
+        self.schema = pa.schema([
+            ('make', pa.string()),
+            ('model', pa.string()),
+            ('year', pa.int16()),
+            ('reliability_score', pa.int16()),
+            ('satisfaction_score', pa.int16()),
+            ('owner_reported_mpg', pa.int16()),
+        ])
+        self.record_schema = pa.schema(list(self.schema) + [
+            ('road_test_score', pa.int16()),
+            ('price_low', pa.int32()),
+            ('price_high', pa.int32()),
+            ('rating_bars', pa.string()),
+            ('trouble_spots', pa.string()),
+            ('schema_version', pa.int16()),
+        ])
+        self._records = None  # whether rows are VehicleRecords, decided by the first row
+        self._rows = []
+        self._token = uuid.uuid4().hex
+        self._flushes = 0
+        if self.resume:
+            existing = pq.read_table(filename, columns=['make', 'model', 'year'])
+            self.completed_keys.update(result_key(row) for row in existing.to_pylist())
+            self._records = 'schema_version' in pq.ParquetDataset(filename).schema.names
+        elif os.path.isdir(filename):
+            shutil.rmtree(filename)
+
+    def _write(self, result):
+        records = 'schema_version' in result
+        if self._records is None:
+            self._records = records
+        elif records and not self._records:
+            raise ValueError(f"Extended rows cannot be added to {self.filename}, which holds basic scores only")
+        if self._records:
+            self._rows.append(VehicleRecord.from_row(result).to_row())
+        else:
+            self._rows.append(VehicleScore.from_result(result).to_dict())
+
+    def flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pylist(self._rows, schema=self.record_schema if self._records else self.schema)
+            self._pq.write_to_dataset(
+                table, self.filename, partition_cols=self.partition_cols,
+                basename_template=f'part-{self._token}-{self._flushes}-{{i}}.parquet'
+            )
+            self._flushes += 1
+            self._rows = []
+        super().flush()
+
+
+WRITERS = {
+    'csv': CsvWriter,
+    'jsonl': JsonLinesWriter,
+    'parquet': ParquetWriter,
+    'dataset': ParquetDatasetWriter,
+}
+
+
+def detect_format(filename, output_format=None):
+    """The writer format for an output path
+
+    Args:
+        filename (str): Output path
+        output_format (str): Format asked for, checked but otherwise returned as is. None guesses it from
+            the extension, and a path without one is a partitioned dataset directory
+
+    Returns:
+        str: 'csv', 'jsonl', 'parquet' or 'dataset'
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if output_format is None:
+        output_format = os.path.splitext(filename)[1].lstrip('.').lower()
+        if os.path.isdir(filename) or not output_format:
+            output_format = 'dataset'
+        elif output_format == 'json':
+            output_format = 'jsonl'
+    if output_format not in WRITERS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    return output_format
+
+
+def open_writer(filename, output_format=None, resume=False, **kwargs):
+    """Open a streaming writer for a results file
+
+    Args:
+        filename (str): Path to the output file
+        output_format (str): 'csv', 'jsonl', 'parquet' or 'dataset'. Taken from the file extension if None,
+            and a path without an extension is a partitioned dataset directory
+        resume (bool): Append to an existing file instead of overwriting it
+
+    Returns:
+        ResultWriter: Writer for the requested format
+    """
+    output_format = detect_format(filename, output_format)
+    return WRITERS[output_format](filename, resume=resume, **kwargs)
+
+
+def read_results(filename, output_format=None):
+    """Read back the results in an output file
+
+    Args:
+        filename (str): Path to a file written by one of the writers
+        output_format (str): 'csv', 'jsonl', 'parquet' or 'dataset'. Taken from the file extension if None
+
+    Yields:
+        dict: One result per row, in file order
+    """
+    output_format = detect_format(filename, output_format)
+    if output_format == 'csv':
+        with open(filename, 'r', newline='') as f:
+            yield from csv.DictReader(f)
+    elif output_format == 'jsonl':
+        with open(filename, 'r') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif output_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(filename).iter_batches():
+            yield from batch.to_pylist()
+    else:
+        for batch in load_dataset(filename).to_batches():
+            yield from batch.to_pylist()
+
+
+def load_dataset(root, makes=None, years=None, columns=None):
+    """Load a partitioned results dataset written by ParquetDatasetWriter
+
+    Partitions outside the requested makes and years are never read.
+
+    Args:
+        root (str): Dataset directory
+        makes (list): Makes to load, spelled as in the data. Defaults to all makes if None
+        years (list): Years to load. Defaults to all years if None
+        columns (list): Columns to load. Defaults to all columns if None
+
+    Returns:
+        pyarrow.Table: Typed results
+    """
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(root, format='parquet', partitioning='hive')
+    condition = None
+    if makes is not None:
+        condition = ds.field('make').isin(list(makes))
+    if years is not None:
+        year_condition = ds.field('year').isin([int(year) for year in years])
+        condition = year_condition if condition is None else condition & year_condition
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def iter_scores(filename, output_format=None):
+    """Read an output file back as compact typed records
+
+    Yields:
+        VehicleScore: One record per row
+    """
+    for row in read_results(filename, output_format):
+        yield VehicleScore.from_result(row)
+
+
+def export_dataset(source, root, **kwargs):
+    """Convert any results file into a partitioned Parquet dataset
+
+    Args:
+        source (str): Results file (.csv, .jsonl or .parquet)
+        root (str): Dataset directory to create
+        **kwargs: Keyword arguments for ParquetDatasetWriter
+
+    Returns:
+        int: Number of rows written
+    """
+    with ParquetDatasetWriter(root, **kwargs) as writer:
+        for row in read_results(source):
+            writer.write(row)
+    return writer.rows_written
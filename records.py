@@ -0,0 +1,134 @@
+import json
+import re
+import sys
+from dataclasses import asdict, dataclass, field, fields
+from typing import Dict, Optional
+
+# Bump when fields are added, removed or change meaning
+SCHEMA_VERSION = 1
+
+_NUMBER = re.compile(r'-?\d+')
+
+
+def to_int(value):
+    """Parse a scraped score into an int, or None for 'N/A', 'NA' and blanks"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    match = _NUMBER.search(str(value))
+    return int(match.group(0)) if match else None
+
+
+@dataclass
+class VehicleScore:
+    """Compact typed result row for the basic fields
+
+    Uses __slots__ and interned make/model strings, so millions of rows
+    across years share one copy of each name. Missing scores ('N/A', 'NA')
+    are None.
+    """
+    __slots__ = ('make', 'model', 'year', 'reliability_score', 'satisfaction_score', 'owner_reported_mpg')
+    make: str
+    model: str
+    year: int
+    reliability_score: Optional[int]
+    satisfaction_score: Optional[int]
+    owner_reported_mpg: Optional[int]
+
+    @classmethod
+    def from_result(cls, result):
+        """Build a score from a scraped result or a row read back from an output file"""
+        return cls(
+            sys.intern(str(result['make'])),
+            sys.intern(str(result['model'])),
+            int(result['year']),
+            to_int(result.get('reliability_score')),
+            to_int(result.get('satisfaction_score')),
+            to_int(result.get('owner_reported_mpg')),
+        )
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+@dataclass
+class VehicleRecord:
+    """Typed record of everything read from one overview page visit
+
+    Produced by the scraper's extended mode. Nested fields are stored as JSON
+    text in flat outputs such as CSV, and every row carries schema_version so
+    that consumers can tell which layout they are reading.
+    """
+    make: str
+    model: str
+    year: int
+    reliability_score: Optional[int] = None
+    satisfaction_score: Optional[int] = None
+    owner_reported_mpg: Optional[int] = None
+    road_test_score: Optional[int] = None
+    price_low: Optional[int] = None
+    price_high: Optional[int] = None
+    rating_bars: Dict[str, int] = field(default_factory=dict)
+    trouble_spots: Dict[str, int] = field(default_factory=dict)
+    schema_version: int = SCHEMA_VERSION
+
+    @classmethod
+    def from_scrape(cls, result):
+        """Build a record from the raw values of field_extraction.EXTENDED_FIELD_SPEC
+
+        Args:
+            result (dict): Scraped vehicle data
+
+        Returns:
+            VehicleRecord: Typed record
+        """
+        price = result.get('price_range')
+        price_low, price_high = price if isinstance(price, list) else (None, None)
+        return cls(
+            make=result['make'],
+            model=result['model'],
+            year=int(result['year']),
+            reliability_score=to_int(result.get('reliability_score')),
+            satisfaction_score=to_int(result.get('satisfaction_score')),
+            owner_reported_mpg=to_int(result.get('owner_reported_mpg')),
+            road_test_score=to_int(result.get('road_test_score')),
+            price_low=price_low,
+            price_high=price_high,
+            rating_bars={label: to_int(value) for label, value in (result.get('rating_bars') or {}).items()},
+            trouble_spots={label: to_int(value) for label, value in (result.get('trouble_spots') or {}).items()},
+        )
+
+    def to_row(self):
+        """Flatten to a dict of scalars, with nested fields as JSON text
+
+        Returns:
+            dict: Row for the output writers
+        """
+        row = asdict(self)
+        row['rating_bars'] = json.dumps(self.rating_bars)
+        row['trouble_spots'] = json.dumps(self.trouble_spots)
+        return row
+
+    @classmethod
+    def from_row(cls, row):
+        """Read a record back from a row written by to_row (e.g. from CSV)
+
+        Raises:
+            ValueError: If the row was written with a newer schema version
+        """
+        version = to_int(row.get('schema_version')) or SCHEMA_VERSION
+        if version > SCHEMA_VERSION:
+            raise ValueError(f"Record schema version {version} is newer than supported version {SCHEMA_VERSION}")
+        values = {}
+        for f in fields(cls):
+            if f.name not in row:
+                continue
+            value = row[f.name]
+            if f.name in ('make', 'model'):
+                values[f.name] = value
+            elif f.name in ('rating_bars', 'trouble_spots'):
+                values[f.name] = json.loads(value) if isinstance(value, str) and value else (value or {})
+            else:
+                values[f.name] = to_int(value)
+        return cls(**values)
@@ -0,0 +1,163 @@
+import csv
+import time
+from datetime import date
+from output_writers import open_writer, result_key
+
+DAY = 24 * 3600
+
+# How often a model year is re-checked by its age, in (max age in years, days between visits) steps
+REFRESH_SCHEDULE = ((1, 7), (3, 30), (6, 90))
+STABLE_INTERVAL_DAYS = 365  # for anything older than the schedule covers
+
+# A vehicle whose scores changed this recently is re-checked at least every RECENT_CHANGE_INTERVAL_DAYS
+RECENT_CHANGE_DAYS = 90
+RECENT_CHANGE_INTERVAL_DAYS = 14
+
+
+def refresh_interval(year, last_changed_at, now=None, current_year=None):
+    """Seconds between visits to a vehicle
+
+    Recent model years are still collecting survey data, so their scores move
+    and they are checked often. Old model years rarely change and are checked
+    rarely, unless their scores changed recently.
+
+    Args:
+        year (int): Model year
+        last_changed_at (float): Unix time the vehicle's scores last changed, or None
+        now (float): Current Unix time. Defaults to time.time()
+        current_year (int): Defaults to the current calendar year
+
+    Returns:
+        float: Seconds
+    """
+    now = time.time() if now is None else now
+    current_year = current_year or date.today().year
+    age = current_year - int(year)
+    days = STABLE_INTERVAL_DAYS
+    for max_age, interval_days in REFRESH_SCHEDULE:
+        if age <= max_age:
+            days = interval_days
+            break
+    if last_changed_at is not None and now - last_changed_at < RECENT_CHANGE_DAYS * DAY:
+        days = min(days, RECENT_CHANGE_INTERVAL_DAYS)
+    return days * DAY
+
+
+def plan_refresh(vehicles, cache, now=None, limit=None):
+    """Pick the vehicles that are due for a visit, most overdue first
+
+    Vehicles never scraped come first. Everything else is due once the time
+    since its last visit passes its refresh_interval, and is ranked by how
+    far past it is. Vehicles in the negative cache are left out until its
+    empty_ttl runs out, since the run visits every vehicle it plans.
+
+    Args:
+        vehicles (iterable): Dicts with keys 'make', 'model', 'year', e.g. from vehicle_catalog.plan_vehicles
+        cache (ResultCache): Result cache with the history of past results
+        now (float): Current Unix time. Defaults to time.time()
+        limit (int): Return at most this many vehicles. None returns all that are due
+
+    Returns:
+        tuple: (list of vehicles to scrape, number of vehicles considered)
+    """
+    now = time.time() if now is None else now
+    states = cache.states()
+    due = []
+    considered = 0
+    for vehicle in vehicles:
+        considered += 1
+        state = states.get(result_key(vehicle))
+        if state is None:
+            if cache.get_empty(vehicle['make'], vehicle['model'], vehicle['year']):
+                continue
+            due.append((float('inf'), considered, vehicle))
+            continue
+        scraped_at, last_changed_at, _ = state
+        overdue = (now - scraped_at) / refresh_interval(vehicle['year'], last_changed_at, now)
+        if overdue >= 1:
+            due.append((overdue, considered, vehicle))
+
+    due.sort(key=lambda item: (-item[0], item[1]))
+    if limit is not None:
+        due = due[:limit]
+    return [vehicle for _, _, vehicle in due], considered
+
+
+def diff_report(cache, since, report_file=None):
+    """List every score that changed at or after a point in time
+
+    Args:
+        cache (ResultCache): Result cache with the history of past results
+        since (float): Unix time, e.g. when the refresh run started
+        report_file (str): CSV file to write the changes to. Not written if None
+
+    Returns:
+        list: Dicts with keys 'make', 'model', 'year', 'field', 'old', 'new'
+    """
+    rows = []
+    for before, after in cache.changes(since):
+        for field in after:
+            if field in ('make', 'model', 'year') or before.get(field) == after.get(field):
+                continue
+            rows.append({'make': after['make'], 'model': after['model'], 'year': after['year'],
+                         'field': field, 'old': before.get(field), 'new': after.get(field)})
+
+    if report_file:
+        with open(report_file, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['make', 'model', 'year', 'field', 'old', 'new'])
+            writer.writeheader()
+            writer.writerows(rows)
+    return rows
+
+
+def run_refresh(vehicles, cache_file='results_cache.db', scraper_options=None, workers=1,
+                requests_per_second=1.0, limit=None, report_file='score_changes.csv', output_file=None,
+                output_format=None):
+    """Re-scrape only the vehicles that are due and report what changed
+
+    Fresh results are stored in the result cache, which keeps their history,
+    and streamed to output_file if one is given.
+
+    Args:
+        vehicles (iterable): Dicts with keys 'make', 'model', 'year'
+        cache_file (str): SQLite result cache with the history of past results
+        scraper_options (dict): Keyword arguments for ConsumerReportsScraper
+        workers (int): Number of pages loading vehicles concurrently
+        requests_per_second (float): Maximum navigations started per second
+        limit (int): Visit at most this many vehicles
+        report_file (str): CSV file the changed scores are written to
+        output_file (str): File the refreshed results are written to, overwriting it. None writes none
+        output_format (str): 'csv', 'jsonl', 'parquet' or 'dataset'. Taken from output_file if None
+
+    Returns:
+        list: Changed scores, see diff_report
+    """
+    from consumer_reports_scraper import ConsumerReportsScraper
+    from result_cache import ResultCache
+
+    cache = ResultCache(cache_file)
+    scraper = ConsumerReportsScraper(cache=cache, **(scraper_options or {}))
+    writer = None
+    started = time.time()
+    try:
+        due, considered = plan_refresh(vehicles, cache, started, limit)
+        print(f"Refreshing {len(due)} of {considered} vehicles")
+        if output_file:
+            writer = open_writer(output_file, output_format=output_format)
+        for result in scraper.iter_vehicles(due, workers=workers, requests_per_second=requests_per_second,
+                                            force_refresh=True):
+            if writer:
+                writer.write(result)
+        changes = diff_report(cache, started, report_file)
+    finally:
+        if writer:
+            writer.close()
+        scraper.close_session()
+        cache.close()
+
+    for change in changes:
+        print(f"{change['make']} {change['model']} {change['year']} {change['field']}: {change['old']} -> {change['new']}")
+    print(f"{len(changes)} changed scores written to {report_file}")
+    if writer:
+        print(f"{writer.rows_written} refreshed results saved to {output_file}")
+    return changes
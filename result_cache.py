@@ -0,0 +1,205 @@
+import json
+import sqlite3
+import time
+from vehicle_catalog import normalize_name
+
+DEFAULT_TTL = 30 * 24 * 3600  # 30 days
+DEFAULT_EMPTY_TTL = 14 * 24 * 3600  # 14 days, so new ratings are picked up reasonably soon
+
+
+class ResultCache:
+    """SQLite store of scraped results keyed by (make, model, year)
+
+    Every result is written as soon as it is scraped, along with the time it
+    was scraped, so an interrupted run can pick up where it stopped. Entries
+    older than the TTL are treated as missing and scraped again.
+
+    Vehicles whose page turned out to have no ratings (404, a redirect away
+    from the overview, or an empty page) are kept in a separate negative
+    cache with its own TTL, so they are not visited again until it expires.
+
+    Every distinct version of a vehicle's result is also kept in a history
+    table, which tells when its scores last changed (see refresh_planner.py).
+    """
+    def __init__(self, filename='results_cache.db', ttl=DEFAULT_TTL, empty_ttl=DEFAULT_EMPTY_TTL):
+        """
+        Args:
+            filename (str): Path to the SQLite database file
+            ttl (float): Seconds before a cached result is stale. None keeps results forever
+            empty_ttl (float): Seconds before a vehicle without ratings is checked again. None never checks again
+        """
+        self.filename = filename
+        self.ttl = ttl
+        self.empty_ttl = empty_ttl
+        # Shared by every shard process: WAL lets readers and the writer overlap, and writers wait for the lock
+        self.conn = sqlite3.connect(filename, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS results (
+                make TEXT NOT NULL,
+                model TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                PRIMARY KEY (make, model, year)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS empty_pages (
+                make TEXT NOT NULL,
+                model TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                reason TEXT,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (make, model, year)
+            )
+        ''')
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS history (
+                make TEXT NOT NULL,
+                model TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                data TEXT NOT NULL,
+                scraped_at REAL NOT NULL
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS history_vehicle ON history (make, model, year, scraped_at)')
+        self.conn.commit()
+
+    @staticmethod
+    def _key(make, model, year):
+        return normalize_name(make), normalize_name(model), int(year)
+
+    def get(self, make, model, year):
+        """Return the cached result for a vehicle
+
+        Returns:
+            dict: Cached result, or None if missing or older than the TTL
+        """
+        row = self.conn.execute(
+            'SELECT data, scraped_at FROM results WHERE make = ? AND model = ? AND year = ?',
+            self._key(make, model, year)
+        ).fetchone()
+        if row is None:
+            return None
+        data, scraped_at = row
+        if self.ttl is not None and time.time() - scraped_at > self.ttl:
+            return None
+        return json.loads(data)
+
+    def put(self, result):
+        """Store a scraped result, replacing any older entry for the same vehicle
+
+        The result is added to the history if it differs from the previous one.
+
+        Args:
+            result (dict): Scraped vehicle data with keys 'make', 'model', 'year'
+
+        Returns:
+            bool: Whether the result differs from the previously stored one (True for a new vehicle)
+        """
+        key = self._key(result['make'], result['model'], result['year'])
+        now = time.time()
+        previous = self.conn.execute(
+            'SELECT data, scraped_at FROM results WHERE make = ? AND model = ? AND year = ?', key
+        ).fetchone()
+        if previous is not None and not self.conn.execute(
+                'SELECT 1 FROM history WHERE make = ? AND model = ? AND year = ? LIMIT 1', key).fetchone():
+            # Stored before history was kept, so the old result becomes its first version
+            self.conn.execute('INSERT INTO history (make, model, year, data, scraped_at) VALUES (?, ?, ?, ?, ?)',
+                              key + previous)
+        changed = previous is None or _scores(json.loads(previous[0])) != _scores(result)
+        if changed:
+            self.conn.execute('INSERT INTO history (make, model, year, data, scraped_at) VALUES (?, ?, ?, ?, ?)',
+                              key + (json.dumps(result), now))
+
+        self.conn.execute(
+            'INSERT OR REPLACE INTO results (make, model, year, data, scraped_at) VALUES (?, ?, ?, ?, ?)',
+            key + (json.dumps(result), now)
+        )
+        self.conn.execute('DELETE FROM empty_pages WHERE make = ? AND model = ? AND year = ?', key)
+        self.conn.commit()
+        return changed
+
+    def states(self):
+        """When every cached vehicle was last scraped and when its result last changed
+
+        Returns:
+            dict: (make, model, year) normalized as in result_key -> (scraped_at, last_changed_at, versions).
+                last_changed_at is None if the result never changed since it was first scraped
+        """
+        rows = self.conn.execute('''
+            SELECT r.make, r.model, r.year, r.scraped_at, MAX(h.scraped_at), COUNT(h.scraped_at)
+            FROM results r LEFT JOIN history h ON h.make = r.make AND h.model = r.model AND h.year = r.year
+            GROUP BY r.make, r.model, r.year
+        ''')
+        return {
+            (make, model, year): (scraped_at, last_changed_at if versions > 1 else None, max(1, versions))
+            for make, model, year, scraped_at, last_changed_at, versions in rows
+        }
+
+    def changes(self, since):
+        """Vehicles whose result changed at or after a point in time
+
+        Returns:
+            list: Tuples of (previous result, new result), the previous being the last version before since
+        """
+        changed = self.conn.execute(
+            'SELECT DISTINCT make, model, year FROM history WHERE scraped_at >= ?', (since,)
+        ).fetchall()
+        pairs = []
+        for key in changed:
+            before = self.conn.execute(
+                'SELECT data FROM history WHERE make = ? AND model = ? AND year = ? AND scraped_at < ? '
+                'ORDER BY scraped_at DESC LIMIT 1', key + (since,)
+            ).fetchone()
+            after = self.conn.execute(
+                'SELECT data FROM history WHERE make = ? AND model = ? AND year = ? '
+                'ORDER BY scraped_at DESC LIMIT 1', key
+            ).fetchone()
+            if before is not None:
+                pairs.append((json.loads(before[0]), json.loads(after[0])))
+        return pairs
+
+    def iter_results(self):
+        """Yield every cached result, fresh or stale
+
+        Yields:
+            dict: Scraped vehicle data
+        """
+        for (data,) in self.conn.execute('SELECT data FROM results ORDER BY make, model, year'):
+            yield json.loads(data)
+
+    def get_empty(self, make, model, year):
+        """Return why a vehicle's page was found to have no ratings
+
+        Returns:
+            str: Reason recorded by put_empty, or None if unknown or older than empty_ttl
+        """
+        row = self.conn.execute(
+            'SELECT reason, checked_at FROM empty_pages WHERE make = ? AND model = ? AND year = ?',
+            self._key(make, model, year)
+        ).fetchone()
+        if row is None:
+            return None
+        reason, checked_at = row
+        if self.empty_ttl is not None and time.time() - checked_at > self.empty_ttl:
+            return None
+        return reason or 'no ratings'
+
+    def put_empty(self, make, model, year, reason):
+        """Record that a vehicle's page has no ratings"""
+        self.conn.execute(
+            'INSERT OR REPLACE INTO empty_pages (make, model, year, reason, checked_at) VALUES (?, ?, ?, ?, ?)',
+            self._key(make, model, year) + (reason, time.time())
+        )
+        self.conn.commit()
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+
+def _scores(result):
+    """The scraped values of a result, without the vehicle's name"""
+    return {key: value for key, value in result.items() if key not in ('make', 'model', 'year')}
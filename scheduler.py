@@ -0,0 +1,244 @@
+import json
+import os
+import random
+import time
+
+
+class ScrapeError(Exception):
+    """A page visit that did not produce a result
+
+    Transient errors (timeouts, throttling, server errors) are worth
+    retrying. Permanent ones (e.g. 404) are sent straight to the dead-letter
+    file.
+    """
+    def __init__(self, message, status=None, transient=True):
+        super().__init__(message)
+        self.status = status
+        self.transient = transient
+
+    @property
+    def throttled(self):
+        return self.status == 429
+
+
+class EmptyPageError(ScrapeError):
+    """The vehicle's page exists but has no ratings, or there is no page at all
+
+    Not worth retrying, and not a failure either: the vehicle goes to the
+    negative cache instead of the dead-letter file.
+    """
+    def __init__(self, message, status=None):
+        super().__init__(message, status=status, transient=False)
+
+
+def check_response(response):
+    """Raise a ScrapeError for HTTP responses that have no usable page
+
+    Args:
+        response: Playwright or requests response, or None
+    """
+    if response is None:
+        return
+    status = response.status if hasattr(response, 'status') else response.status_code
+    if status in (404, 410):
+        raise EmptyPageError(f"HTTP {status}", status=status)
+    if status == 429 or status >= 500:
+        raise ScrapeError(f"HTTP {status}", status=status, transient=True)
+    if status >= 400:
+        raise ScrapeError(f"HTTP {status}", status=status, transient=False)
+
+
+class RateLimiter:
+    """Global pacing for page navigations
+
+    Spaces navigations evenly so that no more than ``requests_per_second``
+    are started, no matter how many worker pages are loading in parallel.
+    """
+    def __init__(self, requests_per_second=1.0):
+        self.rate = requests_per_second
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until the next navigation slot is available"""
+        interval = 1.0 / self.rate if self.rate else 0.0
+        now = time.monotonic()
+        if self._next_slot > now:
+            time.sleep(self._next_slot - now)
+            now = self._next_slot
+        self._next_slot = now + interval
+
+    def record(self, latency=None, error=None):
+        """Report how a request went. A fixed-rate limiter ignores it"""
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """Rate limiter that adapts to how the server responds (AIMD)
+
+    Latency, the error rate and the throttling (429) rate are tracked as
+    moving averages. Each success raises the rate additively, by about
+    ``increase`` requests per second for every second of successful requests,
+    up to ``max_rate``. A congestion signal cuts the rate by ``decrease``, down
+    to ``min_rate``: any throttling, an error while the error rate is above
+    ``error_threshold``, or a slow request while the average latency is above
+    ``latency_target``. The rate does not climb while the error or throttling
+    rate is above the threshold, so an isolated error costs nothing but a bad
+    patch holds it down.
+    """
+    def __init__(self, requests_per_second=1.0, max_rate=None, min_rate=0.05,
+                 increase=0.1, decrease=0.5, latency_target=15.0, error_threshold=0.1):
+        """
+        Args:
+            requests_per_second (float): Starting rate
+            max_rate (float): Highest rate to climb to. Defaults to the starting rate
+            min_rate (float): Lowest rate to back off to
+            increase (float): Additive increase, in requests per second
+            decrease (float): Multiplicative decrease applied on a congestion signal
+            latency_target (float): Average page load seconds above which the server is treated as overloaded
+            error_threshold (float): Error or throttling rate above which errors cut the rate and increases stop
+        """
+        super().__init__(requests_per_second)
+        self.max_rate = max_rate or requests_per_second
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_target = latency_target
+        self.error_threshold = error_threshold
+        self.latency = None
+        self.error_rate = 0.0
+        self.throttle_rate = 0.0
+
+    def record(self, latency=None, error=None):
+        """Adjust the rate after a request
+
+        Args:
+            latency (float): Seconds the request took, if it completed
+            error (Exception): Error raised by the request, or None on success
+        """
+        alpha = 0.1
+        if latency is not None:
+            self.latency = latency if self.latency is None else (1 - alpha) * self.latency + alpha * latency
+        throttled = getattr(error, 'throttled', False)
+        self.error_rate = (1 - alpha) * self.error_rate + alpha * (error is not None)
+        self.throttle_rate = (1 - alpha) * self.throttle_rate + alpha * throttled
+
+        congested = (throttled
+                     or (error is not None and self.error_rate > self.error_threshold)
+                     or (latency is not None and min(latency, self.latency) > self.latency_target))
+        if congested:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if throttled:
+                # Give the server a breather before the next request
+                self._next_slot = max(self._next_slot, time.monotonic() + 1.0 / self.rate)
+        elif error is None and max(self.error_rate, self.throttle_rate) <= self.error_threshold:
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for transient failures"""
+    def __init__(self, max_attempts=4, base_delay=2.0, max_delay=120.0):
+        """
+        Args:
+            max_attempts (int): Attempts per vehicle, including the first
+            base_delay (float): Seconds before the first retry, before jitter
+            max_delay (float): Upper bound on the delay between attempts
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, attempt, error):
+        """Whether a vehicle that failed on attempt number ``attempt`` gets another try"""
+        return getattr(error, 'transient', True) and attempt < self.max_attempts
+
+    def delay(self, attempt):
+        """Seconds to wait before the next attempt ("full jitter" backoff)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class DeadLetterQueue:
+    """Append-only JSON Lines file of vehicles that failed for good
+
+    Nothing disappears silently. Each entry records the error and the number
+    of attempts. ``peek`` hands the vehicles back for a replay run, and
+    ``remove_replayed`` drops them from the file only once that run has
+    dealt with them, so a replay that crashes or cannot log in loses nothing.
+    """
+    def __init__(self, filename='dead_letters.jsonl'):
+        self.filename = filename
+
+    def add(self, make, model, year, error, attempts):
+        """Record a permanently failed vehicle"""
+        entry = {
+            'make': make,
+            'model': model,
+            'year': year,
+            'error': str(error),
+            'status': getattr(error, 'status', None),
+            'attempts': attempts,
+            'failed_at': time.time(),
+        }
+        with open(self.filename, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        print(f"Gave up on {make} {model} {year} after {attempts} attempts: {error}")
+
+    def peek(self):
+        """The vehicles in the file, leaving it as it is
+
+        Returns:
+            list: Dicts with keys 'make', 'model', 'year'
+        """
+        if not os.path.exists(self.filename):
+            return []
+        vehicles = []
+        seen = set()
+        with open(self.filename, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                key = (entry['make'], entry['model'], entry['year'])
+                if key not in seen:
+                    seen.add(key)
+                    vehicles.append({'make': entry['make'], 'model': entry['model'], 'year': entry['year']})
+        return vehicles
+
+    def mark(self):
+        """Position after the last entry, so entries added later can be told apart (see remove_replayed)"""
+        return os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+
+    def remove_replayed(self, done, mark):
+        """Drop the entries of vehicles that a replay run has dealt with
+
+        Entries written before ``mark`` are dropped if their vehicle is done
+        or failed again during the replay. Entries written after it are the
+        vehicles that failed again, and are kept.
+
+        Args:
+            done (callable): Takes make, model and year, and returns whether the vehicle now has a result
+            mark (int): Value of mark() taken before the replay run started
+
+        Returns:
+            int: Number of entries left in the file
+        """
+        if not os.path.exists(self.filename):
+            return 0
+        with open(self.filename, 'rb') as f:
+            content = f.read()
+        replayed, added = content[:mark].splitlines(), content[mark:].splitlines()
+        failed_again = {_entry_key(line) for line in added if line.strip()}
+        kept = [line for line in replayed
+                if line.strip() and _entry_key(line) not in failed_again and not done(*_entry_key(line))]
+        kept += [line for line in added if line.strip()]
+        if not kept:
+            os.remove(self.filename)
+            return 0
+        tmp_file = f'{self.filename}.tmp'
+        with open(tmp_file, 'wb') as f:
+            f.write(b'\n'.join(kept) + b'\n')
+        os.replace(tmp_file, self.filename)
+        return len(kept)
+
+
+def _entry_key(line):
+    entry = json.loads(line)
+    return entry['make'], entry['model'], entry['year']
@@ -0,0 +1,337 @@
+import argparse
+import json
+import sqlite3
+import time
+from collections import deque
+from output_writers import result_key
+from vehicle_catalog import CATALOG_FILE, CatalogIndex, normalize_name, parse_years
+
+JOBS_FILE = 'scrape_jobs.db'
+
+
+class JobQueue:
+    """SQLite-backed queue of scrape jobs and their results
+
+    Clients submit jobs (makes, models and years to refresh) and read the
+    results back as they arrive. The service claims queued jobs and appends
+    results to them. Both sides can run in different processes.
+    """
+    def __init__(self, filename=JOBS_FILE):
+        """
+        Args:
+            filename (str): Path to the SQLite database file
+        """
+        self.filename = filename
+        self.conn = sqlite3.connect(filename, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                total INTEGER,
+                done INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS job_results (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id INTEGER NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS job_results_job ON job_results (job_id, seq);
+        ''')
+        self.conn.commit()
+
+    def submit(self, makes=None, models=None, years=None, force_refresh=False):
+        """Queue a job
+
+        Args:
+            makes (list): Makes to scrape. All makes if None
+            models (list): Models to scrape. All models of the makes if None
+            years (list): Years to scrape. All catalog years if None
+            force_refresh (bool): Visit every page even if the cache has a fresh result
+
+        Returns:
+            int: Job id
+        """
+        request = {'makes': makes, 'models': models, 'years': years, 'force_refresh': force_refresh}
+        cursor = self.conn.execute('INSERT INTO jobs (request, created_at) VALUES (?, ?)',
+                                   (json.dumps(request), time.time()))
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def claim(self):
+        """Mark every queued job as running and return them
+
+        Returns:
+            list: Tuples of (job id, request dict)
+        """
+        with self.conn:
+            rows = self.conn.execute("SELECT id, request FROM jobs WHERE status = 'queued' ORDER BY id").fetchall()
+            self.conn.executemany("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                                  [(time.time(), job_id) for job_id, _ in rows])
+        return [(job_id, json.loads(request)) for job_id, request in rows]
+
+    def set_total(self, job_id, total):
+        with self.conn:
+            self.conn.execute('UPDATE jobs SET total = ? WHERE id = ?', (total, job_id))
+
+    def add_result(self, job_id, result):
+        """Append a result to a job"""
+        with self.conn:
+            self.conn.execute('INSERT INTO job_results (job_id, data) VALUES (?, ?)', (job_id, json.dumps(result)))
+            self.conn.execute('UPDATE jobs SET done = done + 1 WHERE id = ?', (job_id,))
+
+    def finish(self, job_id, error=None):
+        """Mark a job as done, or as failed if error is given"""
+        with self.conn:
+            self.conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                              ('failed' if error else 'done', error, time.time(), job_id))
+
+    def requeue_running(self):
+        """Put jobs left running by a service that stopped back in the queue"""
+        with self.conn:
+            self.conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+
+    def status(self, job_id):
+        """
+        Returns:
+            dict: Job row, or None if there is no such job
+        """
+        self.conn.row_factory = sqlite3.Row
+        try:
+            row = self.conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            self.conn.row_factory = None
+        return dict(row) if row else None
+
+    def results(self, job_id, after=0):
+        """Results of a job appended after sequence number ``after``
+
+        Returns:
+            list: Tuples of (sequence number, result dict)
+        """
+        rows = self.conn.execute('SELECT seq, data FROM job_results WHERE job_id = ? AND seq > ? ORDER BY seq',
+                                 (job_id, after)).fetchall()
+        return [(seq, json.loads(data)) for seq, data in rows]
+
+    def stream_results(self, job_id, poll_interval=1.0):
+        """Yield a job's results as the service produces them, until the job finishes
+
+        Yields:
+            dict: Scraped vehicle data
+        """
+        after = 0
+        while True:
+            # Read the status first so no result written before it finished is missed
+            finished = self.status(job_id)['status'] in ('done', 'failed')
+            for after, result in self.results(job_id, after):
+                yield result
+            if finished:
+                return
+            time.sleep(poll_interval)
+
+    def close(self):
+        self.conn.close()
+
+
+class ScrapeService:
+    """Long-running scraper that works through the job queue with a warm browser
+
+    The browser is started and logged in once, and its worker pages stay
+    open between jobs, so a job only costs page visits. Jobs are expanded
+    against the catalog into vehicles. A vehicle requested by several jobs
+    is scraped once and its result goes to each of them, including jobs
+    submitted while it is already queued or loading. Fresh cached results
+    are returned without a page visit.
+    """
+    def __init__(self, queue, cache=None, scraper_options=None, workers=4, requests_per_second=1.0,
+                 catalog_file=CATALOG_FILE):
+        """
+        Args:
+            queue (JobQueue): Jobs to work through
+            cache (ResultCache, optional): Result cache checked before scraping and updated after
+            scraper_options (dict): Keyword arguments for ConsumerReportsScraper
+            workers (int): Number of pages loading vehicles concurrently
+            requests_per_second (float): Maximum navigations started per second
+            catalog_file (str): Consumer Reports catalog that jobs are expanded against
+        """
+        from consumer_reports_scraper import ConsumerReportsScraper
+
+        self.queue = queue
+        self.cache = cache
+        self.workers = workers
+        self.requests_per_second = requests_per_second
+        self.catalog_file = catalog_file
+        self.scraper = ConsumerReportsScraper(cache=cache, **(scraper_options or {}))
+        self._pending = deque()  # vehicles not handed to the scraper yet
+        self._waiting = {}       # result key -> ids of the jobs waiting for it
+        self._outstanding = {}   # job id -> number of vehicles it is still waiting for
+
+    def run(self, poll_interval=2.0, idle_timeout=None):
+        """Serve jobs until interrupted
+
+        Args:
+            poll_interval (float): Seconds between checks for new jobs while idle
+            idle_timeout (float): Stop after this many seconds without jobs. None runs forever
+        """
+        if not self.scraper.start_session():
+            raise RuntimeError("Could not start a logged-in browser session")
+        self.queue.requeue_running()
+        idle_since = time.monotonic()
+        print("Scrape service ready")
+        try:
+            while True:
+                self._claim_jobs()
+                if not self._pending:
+                    self._finish_jobs()
+                    if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+
+                # Vehicles are already checked against the cache, so every one is a page visit
+                for result in self.scraper.iter_vehicles(self._work(), workers=self.workers,
+                                                         requests_per_second=self.requests_per_second,
+                                                         force_refresh=True, on_outcome=self._drop):
+                    self._deliver(result)
+                self._finish_jobs()
+                idle_since = time.monotonic()
+        finally:
+            self.scraper.close_session()
+
+    def _claim_jobs(self):
+        """Expand newly queued jobs into vehicles, skipping work that is cached or already queued"""
+        for job_id, request in self.queue.claim():
+            # Reloaded only if the catalog file changed since the last job
+            vehicles = CatalogIndex.from_file(self.catalog_file).vehicles(request.get('makes'), request.get('years'))
+            if request.get('models'):
+                models = {normalize_name(model) for model in request['models']}
+                vehicles = (vehicle for vehicle in vehicles if normalize_name(vehicle['model']) in models)
+
+            total = 0
+            outstanding = 0
+            for vehicle in vehicles:
+                total += 1
+                key = result_key(vehicle)
+                if key in self._waiting:
+                    # Already queued or loading for another job
+                    self._waiting[key].append(job_id)
+                    outstanding += 1
+                    continue
+                cached = None
+                if self.cache and not request.get('force_refresh'):
+                    cached = self.cache.get(vehicle['make'], vehicle['model'], vehicle['year'])
+                    if not cached and self.cache.get_empty(vehicle['make'], vehicle['model'], vehicle['year']):
+                        # Known to have no ratings, so there is nothing to return
+                        continue
+                if cached:
+                    self.queue.add_result(job_id, cached)
+                    continue
+                self._waiting[key] = [job_id]
+                self._pending.append(vehicle)
+                outstanding += 1
+
+            self.queue.set_total(job_id, total)
+            print(f"Job {job_id}: {total} vehicles, {total - outstanding} cached")
+            if outstanding:
+                self._outstanding[job_id] = outstanding
+            else:
+                self.queue.finish(job_id)
+
+    def _work(self):
+        """Vehicles for the scraper, picking up jobs submitted while it runs"""
+        while True:
+            if not self._pending:
+                self._claim_jobs()
+                if not self._pending:
+                    return
+            yield self._pending.popleft()
+
+    def _deliver(self, result):
+        """Hand a result to every job waiting for it"""
+        for job_id in self._waiting.pop(result_key(result), []):
+            self.queue.add_result(job_id, result)
+            self._outstanding[job_id] -= 1
+            if not self._outstanding[job_id]:
+                del self._outstanding[job_id]
+                self.queue.finish(job_id)
+
+    def _drop(self, vehicle, outcome):
+        """Stop waiting for a vehicle the scraper finished without a result (see iter_vehicles)"""
+        for job_id in self._waiting.pop(result_key(vehicle), []):
+            self._outstanding[job_id] -= 1
+            if not self._outstanding[job_id]:
+                del self._outstanding[job_id]
+                self.queue.finish(job_id)
+            if outcome == 'failed':
+                print(f"Job {job_id}: no result for {vehicle['make']} {vehicle['model']} {vehicle['year']}, see the dead-letter file")
+
+    def _finish_jobs(self):
+        """Close jobs once the scraper has worked through their vehicles
+
+        Vehicles are normally dropped as the scraper reports them (see _drop).
+        Any still without a result at this point no longer hold their jobs open.
+        """
+        if self._pending:
+            return
+        self._waiting.clear()
+        for job_id, outstanding in self._outstanding.items():
+            self.queue.finish(job_id)
+            if outstanding:
+                print(f"Job {job_id}: {outstanding} vehicles without a result, see the dead-letter file")
+        self._outstanding.clear()
+
+
+def main():
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Scrape Consumer Reports on demand from a job queue")
+    parser.add_argument('--jobs', default=JOBS_FILE, help="SQLite job queue file")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help="Run the service with a warm, logged-in browser")
+    serve.add_argument('--workers', type=int, default=4)
+    serve.add_argument('--requests-per-second', type=float, default=1.0)
+    serve.add_argument('--cache', default='results_cache.db', help="Result cache file")
+
+    submit = subparsers.add_parser('submit', help="Queue a job, e.g. submit --makes Toyota --years 2024-2025")
+    submit.add_argument('--makes', nargs='+')
+    submit.add_argument('--models', nargs='+')
+    submit.add_argument('--years', type=parse_years, help="e.g. 2024-2025 or 2020,2022")
+    submit.add_argument('--force-refresh', action='store_true', help="Ignore cached results")
+    submit.add_argument('--follow', action='store_true', help="Print results as JSON lines until the job finishes")
+
+    status = subparsers.add_parser('status', help="Show a job's progress")
+    status.add_argument('job_id', type=int)
+    args = parser.parse_args()
+
+    queue = JobQueue(args.jobs)
+    try:
+        if args.command == 'serve':
+            from result_cache import ResultCache
+            load_dotenv("ConsumerReportsLogins.env")
+            cache = ResultCache(args.cache)
+            service = ScrapeService(queue, cache, {'block_resources': True, 'wait_for': 'selectors', 'headless': True},
+                                    workers=args.workers, requests_per_second=args.requests_per_second)
+            try:
+                service.run()
+            finally:
+                cache.close()
+        elif args.command == 'submit':
+            job_id = queue.submit(args.makes, args.models, args.years, args.force_refresh)
+            print(f"Queued job {job_id}")
+            if args.follow:
+                for result in queue.stream_results(job_id):
+                    print(json.dumps(result), flush=True)
+        else:
+            print(json.dumps(queue.status(args.job_id), indent=2))
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+import zlib
+from multiprocessing import Pool
+from output_writers import open_writer, read_results, result_key
+from vehicle_catalog import normalize_name
+
+
+def parse_shard(spec):
+    """Parse a shard spec like "2/4" (shard 2 of 4, counting from 1)
+
+    Returns:
+        tuple: (shard, num_shards)
+    """
+    try:
+        shard, num_shards = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {spec!r}")
+    if not 1 <= shard <= num_shards:
+        raise ValueError(f"Shard {shard} is out of range for {num_shards} shards")
+    return shard, num_shards
+
+
+def shard_of(vehicle, num_shards, by='vehicle'):
+    """Deterministically assign a vehicle to a shard
+
+    The hash is stable across processes and hosts, so every machine given the
+    same work list agrees on which shard owns each vehicle.
+
+    Args:
+        vehicle (dict): Vehicle with keys 'make', 'model', 'year'
+        num_shards (int): Total number of shards
+        by (str): 'vehicle' spreads individual vehicles evenly, 'make' keeps each make on one shard
+
+    Returns:
+        int: Shard number, counting from 1
+    """
+    if by == 'make':
+        key = normalize_name(vehicle['make'])
+    else:
+        key = f"{normalize_name(vehicle['make'])}/{normalize_name(vehicle['model'])}/{vehicle['year']}"
+    return zlib.crc32(key.encode('utf-8')) % num_shards + 1
+
+
+def select_shard(vehicles, shard, num_shards, by='vehicle'):
+    """Keep only the vehicles that belong to one shard
+
+    Yields:
+        dict: Vehicles of the shard, in input order
+    """
+    for vehicle in vehicles:
+        if shard_of(vehicle, num_shards, by) == shard:
+            yield vehicle
+
+
+def shard_output_path(output_file, shard, num_shards):
+    """Output file for one shard, e.g. reliability_scores.shard-2-of-4.csv
+
+    A path without an extension, such as a dataset directory, gets a suffix
+    without a dot (reliability_scores-shard-2-of-4), so it still has no extension.
+    """
+    root, ext = os.path.splitext(output_file)
+    if not ext:
+        return f"{output_file}-shard-{shard}-of-{num_shards}"
+    return f"{root}.shard-{shard}-of-{num_shards}{ext}"
+
+
+def run_shard(vehicles, output_file, cache_file='results_cache.db', scraper_options=None,
+              workers=1, requests_per_second=1.0, metrics_file=None, output_format=None, resume=False,
+              total=None):
+    """Scrape one shard with its own browser and write it to its own output file
+
+    Args:
+        vehicles (iterable): Vehicles of this shard
+        output_file (str): Output file for this shard
+        cache_file (str): SQLite result cache shared by all shards. None disables the cache
+        scraper_options (dict): Keyword arguments for ConsumerReportsScraper
+        workers (int): Number of pages loading vehicles concurrently
+        requests_per_second (float): Maximum navigations started per second by this shard
+        metrics_file (str): File stage timings and counters are exported to, see metrics.ScrapeMetrics
+        output_format (str): 'csv', 'jsonl', 'parquet' or 'dataset'. Taken from output_file if None
+        resume (bool): Append to an existing output_file and skip the vehicles in it, instead of overwriting it.
+            The result cache already saves an interrupted run from visiting pages again
+        total (int): Number of vehicles, for the ETA when vehicles is a generator
+
+    Returns:
+        int: Number of results written
+    """
+    from consumer_reports_scraper import ConsumerReportsScraper
+    from metrics import ScrapeMetrics
+    from result_cache import ResultCache
+
+    cache = ResultCache(cache_file) if cache_file else None
+    metrics = ScrapeMetrics(export_file=metrics_file)
+    scraper = ConsumerReportsScraper(cache=cache, metrics=metrics, **(scraper_options or {}))
+    try:
+        with open_writer(output_file, output_format=output_format, resume=resume) as writer:
+            return scraper.scrape_to_writer(vehicles, writer, total=total, workers=workers,
+                                            requests_per_second=requests_per_second)
+    finally:
+        scraper.close_session()
+        if cache:
+            cache.close()
+
+
+def _run_shard_args(args):
+    return run_shard(*args)
+
+
+def merge_shards(output_file, num_shards, output_format=None, resume=False):
+    """Merge the shard outputs into one file
+
+    Shards are concatenated in shard order. With resume, vehicles already in
+    output_file are skipped, so merging into an earlier merge adds only new ones.
+
+    Args:
+        output_file (str): Merged output file
+        num_shards (int): Number of shards
+        output_format (str): Format of the merged file and the shard files. Taken from output_file if None
+        resume (bool): Append to an existing output_file instead of overwriting it
+
+    Returns:
+        int: Number of results added to output_file
+    """
+    count = 0
+    with open_writer(output_file, output_format=output_format, resume=resume) as writer:
+        for shard in range(1, num_shards + 1):
+            shard_file = shard_output_path(output_file, shard, num_shards)
+            if not os.path.exists(shard_file):
+                print(f"Missing shard output {shard_file}")
+                continue
+            for result in read_results(shard_file, output_format):
+                if result_key(result) in writer.completed_keys:
+                    continue
+                writer.write(result)
+                count += 1
+    return count
+
+
+def run_sharded(vehicles, output_file, num_shards, by='vehicle', cache_file='results_cache.db',
+                scraper_options=None, workers=1, requests_per_second=1.0, metrics_file=None, output_format=None,
+                resume=False):
+    """Scrape vehicles in num_shards processes, each with its own browser, then merge
+
+    Args:
+        vehicles (iterable): Dicts with keys 'make', 'model', 'year'
+        output_file (str): Merged output file
+        num_shards (int): Number of shards and processes
+        by (str): Sharding key, see shard_of
+        cache_file (str): SQLite result cache shared by all shards. None disables the cache
+        scraper_options (dict): Keyword arguments for ConsumerReportsScraper
+        workers (int): Number of pages loading vehicles concurrently in each process
+        requests_per_second (float): Maximum navigations started per second across all processes
+        metrics_file (str): Metrics export file. Each process writes its own, named like the shard outputs
+        output_format (str): 'csv', 'jsonl', 'parquet' or 'dataset'. Taken from output_file if None
+        resume (bool): Append to existing shard and merged outputs instead of overwriting them
+
+    Returns:
+        int: Number of results added to output_file
+    """
+    shards = [[] for _ in range(num_shards)]
+    for vehicle in vehicles:
+        shards[shard_of(vehicle, num_shards, by) - 1].append(vehicle)
+
+    per_shard_rate = requests_per_second / num_shards
+    jobs = [
+        (shard_vehicles, shard_output_path(output_file, shard, num_shards), cache_file,
+         scraper_options, workers, per_shard_rate,
+         shard_output_path(metrics_file, shard, num_shards) if metrics_file else None, output_format, resume)
+        for shard, shard_vehicles in enumerate(shards, start=1)
+    ]
+    with Pool(num_shards) as pool:
+        counts = pool.map(_run_shard_args, jobs)
+    print(f"Shards scraped {sum(counts)} vehicles")
+
+    return merge_shards(output_file, num_shards, output_format, resume)
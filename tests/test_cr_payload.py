@@ -0,0 +1,60 @@
+from cr_payload import extract_embedded_json, find_scores, parse_overview_html
+from fixture_server import FixtureServer, fixture_scores
+
+CATALOG = {'Toyota': {'Camry': [2023, 2024]}, 'Land Rover': {'Range Rover Sport': [2024]}}
+
+
+def _overview(server, make_slug, model_slug, year):
+    status, _, body = server.respond(f'/cars/{make_slug}/{model_slug}/{year}/overview')
+    assert status == 200
+    return body.decode('utf-8')
+
+
+def test_parse_fixture_overview():
+    with FixtureServer(catalog=CATALOG) as server:
+        for make, model, slug, year in [('Toyota', 'Camry', 'camry', 2023),
+                                        ('Land Rover', 'Range Rover Sport', 'range-rover-sport', 2024)]:
+            html = _overview(server, '-'.join(make.lower().split()), slug, year)
+            scores = fixture_scores(make, model, year)
+            assert parse_overview_html(html, make, model, year) == {
+                'make': make,
+                'model': model,
+                'year': year,
+                'reliability_score': str(scores['reliability']),
+                'satisfaction_score': str(scores['satisfaction']),
+                'owner_reported_mpg': str(scores['mpg']),
+            }
+
+
+def test_page_without_payload_falls_back():
+    assert parse_overview_html('<html><body><h1>2024 Toyota Camry</h1></body></html>', 'Toyota', 'Camry', 2024) is None
+
+
+def test_malformed_json_is_skipped():
+    html = ('<script type="application/json">{not json</script>'
+            '<script type="application/json">{"ownerReportedMpg": 31}</script>')
+    assert extract_embedded_json(html) == [{'ownerReportedMpg': 31}]
+
+
+def test_best_ranked_key_wins():
+    payload = {'reliability': 3, 'nested': {'predictedReliability': {'score': 78}}}
+    assert find_scores(payload) == {'reliability_score': '78'}
+
+
+def test_numeric_strings_are_scores():
+    assert find_scores({'ownerSatisfaction': ' 4 ', 'ownerReportedMpg': '31.5'}) == {
+        'satisfaction_score': '4',
+        'owner_reported_mpg': '31.5',
+    }
+
+
+def test_digits_inside_text_are_not_scores():
+    assert find_scores({'nav': {'reliability': '/cars/reliability-2024'}}) == {}
+    assert find_scores({'satisfaction': 'Rated 4 of 5'}) == {}
+
+
+def test_values_out_of_range_are_not_scores():
+    assert find_scores({'reliability': 2024, 'ownerReportedMpg': 0, 'satisfaction': -1}) == {}
+    assert find_scores({'reliability': True, 'satisfaction': None}) == {}
+    assert parse_overview_html('<script type="application/json">{"reliability": "id-2024"}</script>',
+                               'Toyota', 'Camry', 2024) is None
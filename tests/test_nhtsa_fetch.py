@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from NHTSA_Vehicles_API import fetch_vehicle_data
+from fixture_server import FixtureServer
+
+CATALOG = {'Toyota': {'Camry': [2024], 'RAV4': [2024]}, 'Honda': {'Civic': [2024]}, 'Acme': {'Rocket': [2024]}}
+EXPECTED = {'toyota': ['camry', 'rav4'], 'honda': ['civic']}
+
+
+@pytest.fixture
+def server():
+    with FixtureServer(catalog=CATALOG) as server:
+        yield server
+
+
+def _fetch(server, tmp_path, ttl=7 * 24 * 3600):
+    return fetch_vehicle_data(file_path=str(tmp_path / 'vehicle_data.json'), base_url=server.nhtsa_url,
+                              cache_dir=str(tmp_path / 'cache'), ttl=ttl, max_workers=2)
+
+
+def test_cold_fetch(server, tmp_path):
+    assert _fetch(server, tmp_path) == EXPECTED
+    # The make list, then the models of each of the car brands (Acme is not one)
+    assert server.requests == 3
+    with open(tmp_path / 'vehicle_data.json') as f:
+        assert json.load(f) == EXPECTED
+
+
+def test_warm_fetch_makes_no_requests(server, tmp_path):
+    _fetch(server, tmp_path)
+    requests = server.requests
+    modified = (tmp_path / 'vehicle_data.json').stat().st_mtime_ns
+
+    assert _fetch(server, tmp_path) == EXPECTED
+    assert server.requests == requests
+    # Unchanged data is not rewritten
+    assert (tmp_path / 'vehicle_data.json').stat().st_mtime_ns == modified
+
+
+def test_stale_cache_is_revalidated(server, tmp_path):
+    _fetch(server, tmp_path)
+    requests = server.requests
+
+    assert _fetch(server, tmp_path, ttl=0) == EXPECTED
+    assert server.requests == 2 * requests
+    assert server.not_modified == requests
@@ -0,0 +1,55 @@
+import pytest
+
+from output_writers import open_writer, read_results
+
+ROW = {'make': 'toyota', 'model': 'camry', 'year': 2020, 'reliability_score': '80'}
+
+
+@pytest.mark.parametrize('ext, torn', [('csv', 'toyota,ra'), ('jsonl', '{"make": "toy')])
+def test_resume_drops_torn_last_line(tmp_path, ext, torn):
+    output = str(tmp_path / f'scores.{ext}')
+    with open_writer(output) as writer:
+        writer.write(ROW)
+    with open(output, 'a') as f:
+        f.write(torn)
+
+    with open_writer(output, resume=True) as writer:
+        assert writer.completed_keys == {('toyota', 'camry', 2020)}
+        writer.write(dict(ROW, model='rav4'))
+    assert [row['model'] for row in read_results(output)] == ['camry', 'rav4']
+
+
+def test_resume_rewrites_torn_csv_header(tmp_path):
+    output = str(tmp_path / 'scores.csv')
+    with open(output, 'w') as f:
+        f.write('make,mo')
+
+    with open_writer(output, resume=True) as writer:
+        writer.write(ROW)
+    assert [row['model'] for row in read_results(output)] == ['camry']
+
+
+def test_dataset_keeps_extended_fields(tmp_path):
+    pytest.importorskip('pyarrow')
+    from records import VehicleRecord
+
+    record = VehicleRecord.from_scrape({'make': 'toyota', 'model': 'camry', 'year': 2020, 'reliability_score': '4',
+                                        'road_test_score': '88', 'price_range': [28000, 35000],
+                                        'rating_bars': {'comfort': '4'}, 'trouble_spots': {'engine': '5'}})
+    root = str(tmp_path / 'dataset')
+    with open_writer(root) as writer:
+        writer.write(record.to_row())
+
+    [row] = read_results(root)
+    assert VehicleRecord.from_row(row) == record
+
+
+def test_dataset_rejects_extended_rows_after_basic_ones(tmp_path):
+    pytest.importorskip('pyarrow')
+    from records import VehicleRecord
+
+    record = VehicleRecord(make='toyota', model='rav4', year=2020)
+    with open_writer(str(tmp_path / 'dataset')) as writer:
+        writer.write(ROW)
+        with pytest.raises(ValueError):
+            writer.write(record.to_row())
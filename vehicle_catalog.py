@@ -0,0 +1,240 @@
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+
+CATALOG_FILE = 'Consumer_Reports_Vehicle_List.json'
+
+
+def normalize_name(name):
+    """Normalize a make or model name to a Consumer Reports URL slug
+
+    Case, surrounding whitespace and the space/dash distinction are ignored,
+    so "Land Rover", "land rover" and "LAND-ROVER" all become "land-rover".
+
+    Args:
+        name (str): Make or model name
+
+    Returns:
+        str: Normalized name
+    """
+    return '-'.join(str(name).lower().replace('-', ' ').split())
+
+
+def parse_years(spec):
+    """Parse a year list like "2024-2025" or "2016,2020-2022"
+
+    Returns:
+        list: Years in the order given
+    """
+    years = []
+    for part in spec.split(','):
+        start, _, end = part.strip().partition('-')
+        years.extend(range(int(start), int(end or start) + 1))
+    return years
+
+
+_loaded = {}  # (builder, absolute path) -> ((mtime, size), value)
+
+
+def load_cached(filename, build=None):
+    """Parse a file once per process, and again only when it changes on disk
+
+    The parsed value is shared by every caller, so it must not be modified.
+
+    Args:
+        filename (str): Path to the file
+        build (callable): Turns the parsed JSON into the value to keep. Defaults to the JSON itself
+
+    Returns:
+        object: The value built from the file's current contents
+    """
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    key = (build, path)
+    entry = _loaded.get(key)
+    if entry is None or entry[0] != signature:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        entry = (signature, build(data) if build else data)
+        _loaded[key] = entry
+    return entry[1]
+
+
+def has_year(years, year):
+    """Check a sorted year array for a year by binary search"""
+    i = bisect_left(years, year)
+    return i < len(years) and years[i] == year
+
+
+def years_between(years, start, end):
+    """The years of a sorted year array from start to end, inclusive"""
+    return years[bisect_left(years, start):bisect_right(years, end)]
+
+
+class CatalogIndex:
+    """Hashed lookup over the Consumer Reports vehicle catalog
+
+    The catalog ({make: {model: [years]}}) is normalized once into a
+    (make, model) -> years index, so checking a vehicle is a single dict
+    lookup instead of a scan over every make and model. The years of each
+    model are kept in a sorted array of 2-byte integers, searched by
+    bisection, which keeps the index small for a catalog with decades of
+    years and supports year-range queries.
+    """
+    def __init__(self, catalog):
+        """
+        Args:
+            catalog (dict): Nested dictionary with structure {make: {model: [years]}}
+        """
+        self._makes = {}
+        self._models = {}
+        self._make_models = {}
+        for make, models in catalog.items():
+            make_key = normalize_name(make)
+            self._makes[make_key] = make
+            model_keys = self._make_models.setdefault(make_key, [])
+            for model, years in models.items():
+                key = (make_key, normalize_name(model))
+                if key not in self._models:
+                    model_keys.append(key)
+                self._models[key] = (make, model, array('H', sorted({int(year) for year in years})))
+
+    @classmethod
+    def from_file(cls, filename=CATALOG_FILE):
+        """Index a catalog JSON file
+
+        The index is built once per process and shared until the file
+        changes, so callers can ask for it freely.
+
+        Args:
+            filename (str): Path to the Consumer Reports catalog file
+
+        Returns:
+            CatalogIndex: Index over the catalog
+        """
+        return load_cached(filename, cls)
+
+    def __len__(self):
+        return len(self._models)
+
+    def has_make(self, make):
+        return normalize_name(make) in self._makes
+
+    def lookup(self, make, model):
+        """Find a make/model in the catalog
+
+        Returns:
+            tuple: (make, model, years) as spelled in the catalog, years as a sorted array,
+                or None if not found
+        """
+        return self._models.get((normalize_name(make), normalize_name(model)))
+
+    def resolve(self, make, model, year):
+        """Check that a vehicle exists in the catalog
+
+        Returns:
+            tuple: (make, model) as spelled in the catalog, or None if unavailable
+        """
+        entry = self.lookup(make, model)
+        if entry is None:
+            return None
+        catalog_make, catalog_model, years = entry
+        if not has_year(years, int(year)):
+            return None
+        return catalog_make, catalog_model
+
+    def models(self):
+        """Model names of every make
+
+        Returns:
+            dict: {make: [models]} as spelled in the catalog
+        """
+        return {self._makes[make_key]: [self._models[key][1] for key in keys]
+                for make_key, keys in self._make_models.items()}
+
+    def _entries(self, makes=None):
+        if makes is None:
+            return self._models.values()
+        keys = (key for make in dict.fromkeys(normalize_name(make) for make in makes)
+                for key in self._make_models.get(make, ()))
+        return (self._models[key] for key in keys)
+
+    def models_between(self, start, end, makes=None):
+        """Models available in any year from start to end, e.g. all models sold 2018-2022
+
+        Args:
+            start (int): First year, inclusive
+            end (int): Last year, inclusive
+            makes (list): Makes to include. Defaults to all makes if None
+
+        Yields:
+            tuple: (make, model, years) as spelled in the catalog, with only the years in the range
+        """
+        for make, model, years in self._entries(makes):
+            in_range = years_between(years, start, end)
+            if in_range:
+                yield make, model, in_range
+
+    def vehicles(self, makes=None, years=None):
+        """Generate every vehicle in the catalog
+
+        Vehicles are generated one at a time from the index, so the work
+        list is never held in memory.
+
+        Args:
+            makes (list): Makes to include. Defaults to all makes if None
+            years (list): Years to include. Defaults to all catalog years if None
+
+        Yields:
+            dict: Vehicle with make, model, and year ready for scraping
+        """
+        wanted = None if years is None else sorted({int(year) for year in years})
+        if wanted == []:
+            return
+        for make, model, model_years in self._entries(makes):
+            if wanted is None:
+                selected = model_years
+            elif len(wanted) == wanted[-1] - wanted[0] + 1:
+                # A contiguous range is a slice of the sorted years
+                selected = years_between(model_years, wanted[0], wanted[-1])
+            else:
+                selected = [year for year in wanted if has_year(model_years, year)]
+            for year in selected:
+                yield {'make': make, 'model': model, 'year': year}
+
+
+def plan_vehicles(vehicles, index=None, resolver=None):
+    """Filter a work list down to vehicles that exist in the catalog
+
+    Invalid or duplicate vehicles are dropped before any browser work, and
+    the ones kept are renamed to their catalog spelling.
+
+    Args:
+        vehicles (iterable): Dicts with keys 'make', 'model', 'year', e.g. from NHTSA_Vehicles_API.load_vehicle_data
+        index (CatalogIndex, optional): Catalog index. Loaded from CATALOG_FILE if None
+        resolver (NameResolver, optional): Maps other spellings of make and model names
+            (e.g. NHTSA's) to catalog names first, see name_resolver.py
+
+    Yields:
+        dict: Vehicle with make, model, and year ready for scraping
+    """
+    if index is None:
+        index = CatalogIndex.from_file()
+    seen = set()
+    for vehicle in vehicles:
+        make, model = vehicle['make'], vehicle['model']
+        if resolver is not None:
+            names = resolver.resolve(make, model)
+            if names is None:
+                continue
+            make, model = names
+        resolved = index.resolve(make, model, vehicle['year'])
+        if resolved is None:
+            continue
+        key = (resolved[0], resolved[1], int(vehicle['year']))
+        if key in seen:
+            continue
+        seen.add(key)
+        yield {'make': key[0], 'model': key[1], 'year': key[2]}